@@ -0,0 +1,26 @@
+"""
+JSON decoding for the checkjebon price data: orjson when it is installed, the stdlib otherwise.
+"""
+
+import json
+
+try:
+    import orjson  # optional fast decoder for the multi-MB checkjebon JSON
+except ImportError:
+    orjson = None
+
+
+def loads(raw, fallback=json.loads):
+    """Decode JSON bytes with orjson when it is installed and accepts them, else with `fallback`.
+
+    Input orjson rejects (NaN, 1e400, lone surrogates) goes to `fallback`. Integers
+    outside the 64-bit range differ by orjson version: 3.8 returns them as floats,
+    losing precision, where json.loads returns exact ints. Only use this for data
+    that holds no such integers.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return fallback(raw)
@@ -5,24 +5,34 @@ Compares receipt OCR data against checkjebon prices and reports discrepancies.
 """
 
 import fcntl
+import functools
+import hashlib
 import json
+import marshal
+import os
 import re
+import struct
 import sys
-import uuid
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
-import urllib.request
-import urllib.parse
 
 LOCAL_FEEDBACK_FILE = Path.home() / ".openclaw" / "workspace" / "grocery-feedback.jsonl"
 
 MAX_FEEDBACK_ENTRIES = 1000
 
+# Byte markers for pre-filtering JSONL lines before parsing. String values are
+# quoted and escaped by json.dumps, so the marker cannot occur inside a product name.
+_PENDING_VALUE = b'"pending_submission"'
+_PENDING_MARKER = b'"status": "pending_submission"'
+
 _CONTRIBUTOR_ID_FILE = Path.home() / ".openclaw" / "workspace" / "contributor-id.txt"
 
 
 def _get_contributor_id() -> str:
     """Return a stable per-installation UUID, generating one on first use."""
+    import uuid  # only needed on submit; keep it off the CLI startup path
+
     if _CONTRIBUTOR_ID_FILE.exists():
         cid = _CONTRIBUTOR_ID_FILE.read_text().strip()
         if cid:
@@ -33,30 +43,157 @@ def _get_contributor_id() -> str:
     return cid
 
 
+# One left-to-right pass: OSC up to BEL, the next ESC or end of string; CSI with a
+# bounded parameter run; then any bare ESC. No pattern can rescan the input.
+_ANSI_RE = re.compile(r'\x1b\][^\x07\x1b]*(?:\x07|\Z)|\x1b\[[0-9;]{0,32}[A-Za-z]|\x1b')
+
+
 def _sanitize_for_display(s: str, max_len: int = 200) -> str:
     """Strip ANSI/VT control sequences and truncate for safe terminal display."""
-    s = re.sub(r'\x1b\][^\x07]*\x07', '', s)      # OSC sequences
-    s = re.sub(r'\x1b\[[0-9;]*[A-Za-z]', '', s)   # CSI sequences
-    s = s.replace('\x1b', '')                       # bare ESC
-    return s[:max_len]
+    return _ANSI_RE.sub('', s)[:max_len]
+
+_CHECKJEBON_FILE = Path.home() / ".openclaw" / "workspace" / "data" / "supermarkets-cache.json"
+
+# Bump when the layout of the tokenized index sidecar changes
+_INDEX_FORMAT = 2
+
+# Pre-tokenized catalogs per store, valid for one checkjebon file signature
+_STORE_INDEXES = {}
+_STORE_INDEX_VERSION = None
+_EMPTY_INDEX = ([], [], {})
+
+
+def _checkjebon_signature():
+    """Return (mtime_ns, size) of the checkjebon cache file, or None if it is missing."""
+    try:
+        st = _CHECKJEBON_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _index_sidecar_file():
+    """Tokenized index cached next to the checkjebon JSON."""
+    return _CHECKJEBON_FILE.with_name("supermarkets-cache.idx")
+
+
+def _read_index_sidecar(signature, store_key):
+    """Return one store's index from the sidecar if it was built from this signature.
+
+    Layout: 8-byte header length, marshal'd header {format, signature, stores:
+    {store: (offset, length)}}, then one marshal'd index per store, so a lookup
+    only deserializes the store it needs.
+    """
+    # marshal: the indexes are plain builtin types, which it loads faster than pickle or JSON
+    try:
+        with open(_index_sidecar_file(), "rb") as f:
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = marshal.loads(f.read(header_len))
+            if not isinstance(header, dict):
+                return None
+            if header.get("format") != _INDEX_FORMAT or header.get("signature") != signature:
+                return None
+            entry = header.get("stores", {}).get(store_key)
+            if entry is None:
+                return _EMPTY_INDEX  # store not in the checkjebon data
+            offset, length = entry
+            f.seek(8 + header_len + offset)
+            return marshal.loads(f.read(length))
+    except (OSError, EOFError, ValueError, TypeError, struct.error):
+        return None
+
+
+def _write_index_sidecar(signature, indexes):
+    """Persist the store indexes atomically; a read-only data dir just skips the cache."""
+    blobs = {store: marshal.dumps(index) for store, index in indexes.items()}
+    offsets = {}
+    position = 0
+    for store, blob in blobs.items():
+        offsets[store] = (position, len(blob))
+        position += len(blob)
+    header = marshal.dumps({"format": _INDEX_FORMAT, "signature": signature, "stores": offsets})
+
+    sidecar = _index_sidecar_file()
+    tmp = sidecar.with_name(sidecar.name + ".tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for blob in blobs.values():
+                f.write(blob)
+        os.replace(tmp, sidecar)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def _build_store_index(store_products):
+    """Map each product-name token to the products containing it, plus per-product word counts."""
+    word_counts = []
+    token_to_products = {}
+    for idx, product in enumerate(store_products):
+        tokens = set(product.get('n', '').lower().split())
+        word_counts.append(len(tokens))
+        for token in tokens:
+            token_to_products.setdefault(token, []).append(idx)
+    return store_products, word_counts, token_to_products
+
+
+def _get_store_index(signature, store_key):
+    """Return a store's index for this checkjebon signature (memory, then sidecar, then JSON)."""
+    global _STORE_INDEX_VERSION
+    if signature != _STORE_INDEX_VERSION:
+        _STORE_INDEXES.clear()
+        _match.cache_clear()
+        _STORE_INDEX_VERSION = signature
+
+    index = _STORE_INDEXES.get(store_key)
+    if index is None:
+        index = _read_index_sidecar(signature, store_key)
+    if index is None:
+        # Sidecar missing or stale: parse the JSON once and index every store
+        with open(_CHECKJEBON_FILE) as f:
+            cache = json.load(f)
+        indexes = {
+            store: _build_store_index(products)
+            for store, products in cache.get("data", {}).items()
+        }
+        _write_index_sidecar(signature, indexes)
+        _STORE_INDEXES.update(indexes)
+        index = indexes.get(store_key, _EMPTY_INDEX)
+    _STORE_INDEXES[store_key] = index
+    return index
+
 
 def verify_receipt_against_checkjebon(receipt_data, store_name):
     """Compare receipt prices against checkjebon data."""
-    # Load checkjebon data
-    checkjebon_file = Path.home() / ".openclaw" / "workspace" / "data" / "supermarkets-cache.json"
-    if not checkjebon_file.exists():
+    return _apply_default_dates(*_price_discrepancies(receipt_data, store_name))
+
+
+def _apply_default_dates(discrepancies, undated):
+    """Date the discrepancies at `undated` positions now; items without a date share one timestamp."""
+    now_iso = datetime.now().isoformat()
+    for i in undated:
+        discrepancies[i]["date"] = now_iso
+    return discrepancies
+
+
+def _price_discrepancies(receipt_data, store_name):
+    """Return (discrepancies, positions of those whose receipt item had no date)."""
+    # Load the tokenized checkjebon indexes (memory, then sidecar, then JSON)
+    signature = _checkjebon_signature()
+    if signature is None:
         print("No checkjebon cache found. Run: python3 scripts/supermarket_prices.py update")
-        return []
+        return [], []
     
-    with open(checkjebon_file) as f:
-        cache = json.load(f)
-        store_products = cache.get("data", {}).get(store_name.lower(), [])
+    store_key = store_name.lower()
+    _get_store_index(signature, store_key)
     
     discrepancies = []
+    undated = []
     
     for receipt_item in receipt_data:
         # Find matching product in checkjebon data  
-        best_match = find_best_product_match(receipt_item['name'], store_products)
+        best_match, confidence = _match(receipt_item['name'].lower(), store_key)
         
         if best_match:
             price_diff_signed = receipt_item['price'] - best_match['price']
@@ -68,48 +205,96 @@ def verify_receipt_against_checkjebon(receipt_data, store_name):
                     "checkjebon_price": best_match['price'],
                     "price_difference": price_diff_signed,
                     "store": store_name,
-                    "date": receipt_item.get('date', datetime.now().isoformat()),
-                    "confidence": calculate_match_confidence(receipt_item['name'], best_match['name'])
+                    "date": receipt_item.get('date'),
+                    "confidence": confidence
                 }
+                if 'date' not in receipt_item:
+                    undated.append(len(discrepancies))
                 discrepancies.append(discrepancy)
     
-    return discrepancies
+    return discrepancies, undated
 
-def find_best_product_match(receipt_name, store_products):
-    """Find best matching product using fuzzy matching."""
-    receipt_words = set(receipt_name.lower().split())
-    best_match = None
+
+# A product matches only if more than this share of the words overlap
+MIN_MATCH_SCORE = 0.30
+
+
+def _best_match_in_index(receipt_words, store_index):
+    """Return (best-overlapping product, common word count, its word count) from a store index."""
+    store_products, word_counts, token_to_products = store_index
+    best_idx = None
     best_score = 0
+    receipt_len = len(receipt_words)
+    
+    # Each product appears once in the posting list of every receipt word it
+    # contains, so counting posting hits gives the intersection sizes directly
+    # (Counter does the counting in C) - no per-product set operations needed.
+    common_counts = Counter()
+    for word in receipt_words:
+        common_counts.update(token_to_products.get(word, ()))
     
-    for product in store_products:
-        product_words = set(product.get('n', '').lower().split())
+    # Visit candidates best-first: a product sharing `common` words scores at
+    # most common / receipt_len, so once that bound drops below the best score
+    # (or the 30% floor) no remaining candidate can win and the scan stops.
+    # most_common() sorts in C; most lookups end after the few high-overlap products.
+    for idx, common in common_counts.most_common():
+        bound = common / max(receipt_len, 1)
+        if bound <= MIN_MATCH_SCORE or bound < best_score:
+            break
         
         # Calculate word overlap score
-        common_words = receipt_words.intersection(product_words)
-        score = len(common_words) / max(len(receipt_words), len(product_words), 1)
+        score = common / max(receipt_len, word_counts[idx], 1)
         
-        if score > best_score and score > 0.3:  # Minimum 30% word overlap
+        # Minimum 30% word overlap; equal scores go to the earliest product in the catalog
+        if score > MIN_MATCH_SCORE and (score > best_score or (score == best_score and idx < best_idx)):
             best_score = score  
-            best_match = {
-                "name": product.get('n', ''),
-                "price": product.get('p', 0),
-                "size": product.get('s', ''),
-            }
+            best_idx = idx
     
-    return best_match
+    if best_idx is None:
+        return None, 0, 0
+    product = store_products[best_idx]
+    best_match = {
+        "name": product.get('n', ''),
+        "price": product.get('p', 0),
+        "size": product.get('s', ''),
+    }
+    return best_match, common_counts[best_idx], word_counts[best_idx]
 
-def calculate_match_confidence(receipt_name, product_name):
-    """Calculate confidence score for product matching."""
+
+@functools.lru_cache(maxsize=4096)
+def _match(receipt_name_lower, store_key):
+    """Memoized (best match, confidence) of a lowercased receipt name in an indexed store."""
+    receipt_words = set(receipt_name_lower.split())
+    index = _STORE_INDEXES.get(store_key, _EMPTY_INDEX)
+    best_match, common, product_len = _best_match_in_index(receipt_words, index)
+    if best_match is None:
+        return None, 0.0
+    # Jaccard from the counts: |A & B| / (|A| + |B| - |A & B|), no re-tokenizing
+    return best_match, common / (len(receipt_words) + product_len - common)
+
+
+def find_best_product_match(receipt_name, store_products, store_index=None):
+    """Find best matching product using fuzzy matching.
+
+    Pass the _build_store_index(store_products) result as `store_index` to reuse it
+    across lookups in the same catalog; otherwise the catalog is indexed for this call.
+    """
+    if store_index is None:
+        store_index = _build_store_index(store_products)
     receipt_words = set(receipt_name.lower().split())
-    product_words = set(product_name.lower().split())
-    
+    return _best_match_in_index(receipt_words, store_index)[0]
+
+
+def _jaccard(receipt_words, product_words):
+    """Jaccard similarity of two token sets (0.0 if either is empty)."""
     if not receipt_words or not product_words:
         return 0.0
-        
-    common_words = receipt_words.intersection(product_words)
-    union_words = receipt_words.union(product_words)
-    
-    return len(common_words) / len(union_words)
+    return len(receipt_words & product_words) / len(receipt_words | product_words)
+
+
+def calculate_match_confidence(receipt_name, product_name):
+    """Calculate confidence score for product matching."""
+    return _jaccard(set(receipt_name.lower().split()), set(product_name.lower().split()))
 
 def submit_feedback_locally(discrepancies):
     """Store feedback locally for later batch submission."""
@@ -140,6 +325,8 @@ _ALLOWED_API_HOSTS = {"localhost", "127.0.0.1"}
 
 def _validate_api_url(api_url: str) -> None:
     """Prevent SSRF by restricting scheme and host."""
+    import urllib.parse
+
     parsed = urllib.parse.urlparse(api_url)
     if parsed.scheme not in ("http", "https"):
         raise ValueError(f"Invalid URL scheme: {parsed.scheme!r}")
@@ -147,6 +334,85 @@ def _validate_api_url(api_url: str) -> None:
         raise ValueError(f"API host not in allowlist: {parsed.hostname!r}")
 
 
+def _open_api_connection(api_url):
+    """Return a reusable connection to the (validated) API and the bulk-submit path."""
+    import http.client  # networking is only needed for submit; keep stats/verify startup lean
+    import urllib.parse
+
+    parsed = urllib.parse.urlparse(api_url)
+    conn_cls = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    conn = conn_cls(parsed.hostname, parsed.port, timeout=10)
+    return conn, f"{parsed.path.rstrip('/')}/api/v1/submit-bulk"
+
+
+def _post_json(conn, path, payload):
+    """POST a JSON payload over a kept-alive connection and return the decoded reply."""
+    import http.client
+
+    conn.request("POST", path, body=json.dumps(payload).encode('utf-8'),
+                 headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    body = response.read()  # drain fully so the connection can carry the next batch
+    if not 200 <= response.status < 300:
+        raise http.client.HTTPException(f"HTTP {response.status}")
+    return json.loads(body.decode())
+
+
+def _to_api_corrections(batch):
+    """Convert feedback entries to the community API's correction records."""
+    corrections = []
+    for entry in batch:
+        for discrepancy in entry.get("discrepancies", []):
+            corrections.append({
+                "product_name": discrepancy["receipt_product"],
+                "store_chain": discrepancy["store"],
+                "actual_price": discrepancy["receipt_price"],
+                "checkjebon_price": discrepancy["checkjebon_price"],
+                "verified_date": discrepancy.get("date", "2026-02-20"),
+                "verification_method": "receipt_ocr",
+                "confidence_score": discrepancy.get("confidence", 0.5)
+            })
+    return corrections
+
+
+_MAX_CONCURRENT_SUBMITS = 4
+
+
+def _post_batches(api_url, payloads):
+    """POST payloads concurrently and return each reply (or the exception raised), in order.
+
+    Each worker thread keeps its own connection alive across the batches it sends;
+    failed connections are dropped so the next batch reconnects.
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not payloads:
+        return []
+
+    local = threading.local()
+    opened = []
+
+    def post(payload):
+        if getattr(local, "conn", None) is None:
+            local.conn, local.path = _open_api_connection(api_url)
+            opened.append(local.conn)
+        try:
+            return _post_json(local.conn, local.path, payload)
+        except Exception:
+            local.conn.close()
+            local.conn = None
+            raise
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(_MAX_CONCURRENT_SUBMITS, len(payloads))) as executor:
+            futures = [executor.submit(post, payload) for payload in payloads]
+            return [future.exception() or future.result() for future in futures]
+    finally:
+        for conn in opened:
+            conn.close()
+
+
 def submit_feedback_to_community(batch_size=10, api_url="http://localhost:5000"):
     """Submit accumulated feedback to community database."""
     _validate_api_url(api_url)
@@ -155,11 +421,16 @@ def submit_feedback_to_community(batch_size=10, api_url="http://localhost:5000")
         print("No feedback to submit.")
         return
     
+    # Fold status tombstones from earlier runs back into the JSONL once per submit run
+    compact_feedback()
+    
     pending_entries = []
-    with open(LOCAL_FEEDBACK_FILE) as f:
+    with open(LOCAL_FEEDBACK_FILE, "rb") as f:
         for line in f:
+            if _PENDING_VALUE not in line:
+                continue  # cannot be pending; skip the parse
             try:
-                entry = json.loads(line.strip())
+                entry = json.loads(line)
             except json.JSONDecodeError:
                 continue
             if entry.get("status") == "pending_submission":
@@ -171,90 +442,120 @@ def submit_feedback_to_community(batch_size=10, api_url="http://localhost:5000")
     
     print(f"🚀 Submitting {len(pending_entries)} feedback entries to community API...")
     
-    # Submit in batches
-    submitted_count = 0
+    contributor_id = _get_contributor_id()  # Finding #8: stable per-install UUID
+    
+    # Convert batches to API format up front so they can be posted concurrently
+    batches = []
+    payloads = []
     for i in range(0, len(pending_entries), batch_size):
         batch = pending_entries[i:i + batch_size]
-        
         try:
-            # Convert to API format
-            corrections = []
-            for entry in batch:
-                for discrepancy in entry.get("discrepancies", []):
-                    corrections.append({
-                        "product_name": discrepancy["receipt_product"],
-                        "store_chain": discrepancy["store"],
-                        "actual_price": discrepancy["receipt_price"],
-                        "checkjebon_price": discrepancy["checkjebon_price"],
-                        "verified_date": discrepancy.get("date", "2026-02-20"),
-                        "verification_method": "receipt_ocr",
-                        "confidence_score": discrepancy.get("confidence", 0.5)
-                    })
-            
-            if corrections:
-                # Submit to community API
-                payload = {
-                    "corrections": corrections,
-                    "contributor_id": _get_contributor_id()  # Finding #8: stable per-install UUID
-                }
-                
-                data = json.dumps(payload).encode('utf-8')
-                req = urllib.request.Request(
-                    f"{api_url}/api/v1/submit-bulk",
-                    data=data,
-                    headers={'Content-Type': 'application/json'}
-                )
-                
-                with urllib.request.urlopen(req, timeout=10) as response:
-                    result = json.loads(response.read().decode())
-                    
-                print(f"✅ Submitted {result.get('submitted', 0)} corrections")
-                
-                # Mark as submitted locally
-                mark_entries_submitted([e["timestamp"] for e in batch])
-                submitted_count += len(batch)
-            
-        except Exception as e:
+            corrections = _to_api_corrections(batch)
+        except (KeyError, TypeError) as e:
             print(f"❌ Failed to submit batch: {type(e).__name__}", file=sys.stderr)
-            break
+            continue
+        if corrections:
+            batches.append(batch)
+            payloads.append({"corrections": corrections, "contributor_id": contributor_id})
+    
+    submitted_count = 0
+    for batch, outcome in zip(batches, _post_batches(api_url, payloads)):
+        if isinstance(outcome, Exception):
+            print(f"❌ Failed to submit batch: {type(outcome).__name__}", file=sys.stderr)
+            continue
+        
+        print(f"✅ Submitted {outcome.get('submitted', 0)} corrections")
+        
+        # Mark as submitted locally
+        mark_entries_submitted([e["timestamp"] for e in batch])
+        submitted_count += len(batch)
     
     print(f"📊 Successfully submitted {submitted_count} feedback entries to community database.")
 
-def mark_entries_submitted(timestamps):
-    """Mark feedback entries as submitted (exclusive lock prevents concurrent data loss)."""
-    if not LOCAL_FEEDBACK_FILE.exists():
-        return
+def _feedback_status_file():
+    """Sidecar of append-only status tombstones next to the feedback JSONL."""
+    return LOCAL_FEEDBACK_FILE.with_name("grocery-feedback-status.jsonl")
 
-    with open(LOCAL_FEEDBACK_FILE, "r+") as fh:
-        fcntl.flock(fh, fcntl.LOCK_EX)
-        entries = []
-        for line in fh:
+
+def _load_submitted_timestamps():
+    """Return the timestamps of entries marked submitted in the status sidecar."""
+    status_file = _feedback_status_file()
+    if not status_file.exists():
+        return set()
+
+    submitted = set()
+    with open(status_file) as f:
+        for line in f:
             try:
                 entry = json.loads(line.strip())
             except json.JSONDecodeError:
                 continue
-            if entry.get("timestamp") in timestamps:
-                entry["status"] = "submitted"
-            entries.append(entry)
-        fh.seek(0)
-        fh.truncate()
-        for entry in entries:
-            fh.write(json.dumps(entry) + "\n")
+            if entry.get("status") == "submitted":
+                submitted.add(entry.get("timestamp"))
+    return submitted
+
+
+def mark_entries_submitted(timestamps):
+    """Mark feedback entries as submitted by appending tombstones (O(batch), no rewrite)."""
+    if not LOCAL_FEEDBACK_FILE.exists() or not timestamps:
+        return
+
+    with open(_feedback_status_file(), "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        fh.write("".join(
+            json.dumps({"timestamp": timestamp, "status": "submitted"}) + "\n" for timestamp in timestamps
+        ))
         # Lock released on close
 
+
+def compact_feedback():
+    """Apply status tombstones to the feedback JSONL and clear the sidecar (exclusive locks)."""
+    status_file = _feedback_status_file()
+    if not LOCAL_FEEDBACK_FILE.exists() or not status_file.exists():
+        return
+
+    with open(status_file, "r+") as status_fh:
+        # Hold the sidecar lock so no tombstone is appended between reading and clearing it
+        fcntl.flock(status_fh, fcntl.LOCK_EX)
+        submitted = _load_submitted_timestamps()
+        if submitted:
+            with open(LOCAL_FEEDBACK_FILE, "r+") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                entries = []
+                for line in fh:
+                    try:
+                        entry = json.loads(line.strip())
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get("timestamp") in submitted:
+                        entry["status"] = "submitted"
+                    entries.append(entry)
+                fh.seek(0)
+                fh.truncate()
+                # One buffered write instead of one small write per entry
+                fh.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        status_fh.truncate(0)
+        # Locks released on close
+
 def count_pending_feedback():
     """Count pending feedback entries."""
     if not LOCAL_FEEDBACK_FILE.exists():
         return 0
     
+    submitted = _load_submitted_timestamps()
     count = 0
-    with open(LOCAL_FEEDBACK_FILE) as f:
+    with open(LOCAL_FEEDBACK_FILE, "rb") as f:
         for line in f:
+            if _PENDING_VALUE not in line:
+                continue
+            if not submitted and _PENDING_MARKER in line:
+                count += 1  # written by json.dumps; no tombstones to check, so no parse needed
+                continue
             try:
-                entry = json.loads(line.strip())
+                entry = json.loads(line)
             except json.JSONDecodeError:
                 continue
-            if entry.get("status") == "pending_submission":
+            if entry.get("status") == "pending_submission" and entry.get("timestamp") not in submitted:
                 count += 1
     return count
 
@@ -264,46 +565,198 @@ _ALLOWED_RECEIPT_DIR = Path.home() / ".openclaw"
 _MAX_STORE_NAME = 100
 
 
+def _read_receipt_file(receipt_path):
+    """Return the raw bytes of a receipt JSON file (None on error)."""
+    resolved = Path(receipt_path).resolve()
+    try:
+        resolved.relative_to(_ALLOWED_RECEIPT_DIR.resolve())
+    except ValueError:
+        print(f"Receipt path must be within {_ALLOWED_RECEIPT_DIR}: {resolved}")
+        return None
+    try:
+        return resolved.read_bytes()
+    except FileNotFoundError:
+        print(f"Receipt file not found: {receipt_path}")
+        return None
+
+
+def _simulated_receipt_data(receipt_path):
+    """Example receipt items used when the receipt is an image."""
+    # Finding #9: sanitize receipt_path before printing to prevent ANSI terminal injection
+    print(f"Using simulated data for {_sanitize_for_display(receipt_path)}")
+    return [
+        {"name": "Melk Halfvol 1L", "price": 1.89, "date": "2026-02-20"},
+        {"name": "Brood Wit", "price": 1.29, "date": "2026-02-20"},
+        {"name": "Kaas Gouda Jong", "price": 4.99, "date": "2026-02-20"}
+    ]
+
+
+def _analysis_cache_file():
+    """Cache of prior receipt analyses, kept next to the feedback log."""
+    return LOCAL_FEEDBACK_FILE.with_name("receipt-analysis-cache.jsonl")
+
+
+# Bytes of analyses kept in the cache; once it doubles, the oldest entries are dropped
+MAX_ANALYSIS_BYTES = 1024 * 1024
+
+
+def _lookup_analysis(digest, store_name, signature):
+    """Return the cached (discrepancies, undated positions) for a receipt digest, or None on a miss."""
+    needle = digest.encode()
+    try:
+        with open(_analysis_cache_file(), "rb") as fh:
+            for line in fh:
+                if needle not in line:  # hex digest: cheap pre-filter before parsing
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if (entry.get("digest") == digest and entry.get("store") == store_name
+                        and entry.get("signature") == list(signature)):
+                    return entry.get("discrepancies"), entry.get("undated", [])
+    except OSError:
+        pass
+    return None
+
+
+def _store_analysis(digest, store_name, signature, discrepancies, undated):
+    """Record a receipt analysis; entries made against an older checkjebon cache are dropped."""
+    # Defaulted dates are left out (applied on read), so a later hit is dated when it happens
+    entry = {"signature": list(signature), "digest": digest, "store": store_name,
+             "discrepancies": discrepancies, "undated": undated}
+    try:
+        cache_file = _analysis_cache_file()
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, "a+b") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            # Every line shares one signature, so the first line says whether the file is stale
+            fh.seek(0)
+            first = fh.readline()
+            try:
+                stale = bool(first) and json.loads(first).get("signature") != entry["signature"]
+            except ValueError:
+                stale = True
+            size = os.fstat(fh.fileno()).st_size
+            if stale:
+                fh.truncate(0)
+            elif size >= 2 * MAX_ANALYSIS_BYTES:
+                # Trimming only at twice the cap keeps appends O(1) amortized
+                fh.seek(size - MAX_ANALYSIS_BYTES)
+                fh.readline()  # start at the next whole entry
+                kept = fh.read()
+                fh.truncate(0)
+                fh.write(kept)
+            fh.write((json.dumps(entry) + "\n").encode())
+    except OSError:
+        pass  # the cache is only an optimization
+
+
+def find_receipt_discrepancies(receipt_path, store_name):
+    """Return price discrepancies for a receipt without logging them (None if unreadable)."""
+    store_name = str(store_name)[:_MAX_STORE_NAME]  # Finding #7: cap before any processing
+
+    if not receipt_path.endswith('.json'):
+        return verify_receipt_against_checkjebon(_simulated_receipt_data(receipt_path), store_name)
+
+    raw = _read_receipt_file(receipt_path)
+    if raw is None:
+        return None
+
+    # The same receipt bytes against the same checkjebon cache give the same result
+    signature = _checkjebon_signature()
+    if signature is None:
+        return verify_receipt_against_checkjebon(json.loads(raw), store_name)
+    digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+    analysis = _lookup_analysis(digest, store_name, signature)
+    if analysis is None:
+        analysis = _price_discrepancies(json.loads(raw), store_name)
+        _store_analysis(digest, store_name, signature, *analysis)
+    return _apply_default_dates(*analysis)
+
+
+def report_discrepancies(discrepancies):
+    """Print a per-product summary of price discrepancies."""
+    if not discrepancies:
+        print("✅ All receipt prices match checkjebon data.")
+        return
+
+    print(f"\n🔍 Found {len(discrepancies)} price discrepancies:")
+    for d in discrepancies:
+        safe_product = _sanitize_for_display(d['receipt_product'])
+        print(f"  • {safe_product}: €{d['receipt_price']:.2f} (receipt) vs €{d['checkjebon_price']:.2f} (checkjebon)")
+        print(f"    Difference: €{d['price_difference']:.2f}, Confidence: {d['confidence']:.2f}")
+
+
 def analyze_receipt_file(receipt_path, store_name):
     """Analyze a receipt file and generate feedback."""
-    store_name = str(store_name)[:_MAX_STORE_NAME]  # Finding #7: cap before any processing
+    discrepancies = find_receipt_discrepancies(receipt_path, store_name)
+    if discrepancies is None:
+        return
 
-    # Try to load actual receipt data
-    if receipt_path.endswith('.json'):
-        resolved = Path(receipt_path).resolve()
-        try:
-            resolved.relative_to(_ALLOWED_RECEIPT_DIR.resolve())
-        except ValueError:
-            print(f"Receipt path must be within {_ALLOWED_RECEIPT_DIR}: {resolved}")
-            return
-        try:
-            with open(resolved) as f:
-                receipt_data = json.load(f)
-        except FileNotFoundError:
-            print(f"Receipt file not found: {receipt_path}")
-            return
-    else:
-        # Fallback: simulate with example data
-        # Finding #9: sanitize receipt_path before printing to prevent ANSI terminal injection
-        print(f"Using simulated data for {_sanitize_for_display(receipt_path)}")
-        receipt_data = [
-            {"name": "Melk Halfvol 1L", "price": 1.89, "date": "2026-02-20"},
-            {"name": "Brood Wit", "price": 1.29, "date": "2026-02-20"},
-            {"name": "Kaas Gouda Jong", "price": 4.99, "date": "2026-02-20"}
-        ]
-    
-    discrepancies = verify_receipt_against_checkjebon(receipt_data, store_name)
-    
+    report_discrepancies(discrepancies)
     if discrepancies:
-        print(f"\n🔍 Found {len(discrepancies)} price discrepancies:")
-        for d in discrepancies:
-            safe_product = _sanitize_for_display(d['receipt_product'])
-            print(f"  • {safe_product}: €{d['receipt_price']:.2f} (receipt) vs €{d['checkjebon_price']:.2f} (checkjebon)")
-            print(f"    Difference: €{d['price_difference']:.2f}, Confidence: {d['confidence']:.2f}")
-        
         submit_feedback_locally(discrepancies)
+
+def show_feedback_stats():
+    """Print pending/submitted feedback counts."""
+    pending = count_pending_feedback()
+    print(f"Pending feedback entries: {pending}")
+
+    if LOCAL_FEEDBACK_FILE.exists():
+        with open(LOCAL_FEEDBACK_FILE) as f:
+            total = sum(1 for _ in f)
+        print(f"Total feedback entries: {total}")
+        print(f"Submitted: {total - pending}")
     else:
-        print("✅ All receipt prices match checkjebon data.")
+        print("No feedback file found yet.")
+
+def _handle_daemon_command(request):
+    """Run one daemon command and return its JSON-serializable reply."""
+    cmd = request.get("cmd") if isinstance(request, dict) else None
+    if cmd == "verify":
+        receipt_path, store_name = request.get("receipt"), request.get("store")
+        if not isinstance(receipt_path, str) or not isinstance(store_name, str):
+            return {"ok": False, "error": "verify requires string 'receipt' and 'store'"}
+        discrepancies = find_receipt_discrepancies(receipt_path, store_name)
+        if discrepancies is None:
+            return {"ok": False, "error": "receipt could not be read"}
+        if discrepancies:
+            submit_feedback_locally(discrepancies)
+        return {"ok": True, "discrepancies": discrepancies}
+    if cmd == "stats":
+        return {"ok": True, "pending": count_pending_feedback()}
+    return {"ok": False, "error": f"unknown command: {_sanitize_for_display(str(cmd))}"}
+
+
+def run_daemon(stdin=None, stdout=None):
+    """Serve JSON-line commands from stdin until EOF, one JSON reply line each.
+    
+    Keeps one interpreter (and its in-memory checkjebon index) alive across
+    many receipts. Human-readable progress output goes to stderr so stdout
+    carries only replies.
+    """
+    import contextlib
+
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            reply = {"ok": False, "error": "invalid JSON"}
+        else:
+            try:
+                with contextlib.redirect_stdout(sys.stderr):
+                    reply = _handle_daemon_command(request)
+            except Exception as e:
+                # One failing receipt must not end the session for the client
+                reply = {"ok": False, "error": _sanitize_for_display(str(e))}
+        stdout.write(json.dumps(reply) + "\n")
+        stdout.flush()
+
 
 def main():
     if len(sys.argv) < 2:
@@ -311,6 +764,7 @@ def main():
         print("  python3 grocery_feedback.py verify <receipt_path> <store_name>")
         print("  python3 grocery_feedback.py submit")
         print("  python3 grocery_feedback.py stats")
+        print("  python3 grocery_feedback.py --daemon   (JSON-line commands on stdin)")
         print("\nShowing current stats:")
         command = "stats"
     else:
@@ -329,16 +783,10 @@ def main():
         submit_feedback_to_community()
         
     elif command == "stats":
-        pending = count_pending_feedback()
-        print(f"Pending feedback entries: {pending}")
-        
-        if LOCAL_FEEDBACK_FILE.exists():
-            with open(LOCAL_FEEDBACK_FILE) as f:
-                total = sum(1 for _ in f)
-            print(f"Total feedback entries: {total}")
-            print(f"Submitted: {total - pending}")
-        else:
-            print("No feedback file found yet.")
+        show_feedback_stats()
+    
+    elif command in ("--daemon", "daemon"):
+        run_daemon()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,11 +5,63 @@ Integrates price checking, feedback generation, community API, and receipt proce
 """
 
 import argparse
-import json
-import subprocess
+import functools
+import os
+import re
 import sys
 from pathlib import Path
-from datetime import datetime
+
+from grocery_feedback import (
+    analyze_receipt_file,
+    find_receipt_discrepancies,
+    report_discrepancies,
+    show_feedback_stats,
+    submit_feedback_locally,
+    submit_feedback_to_community,
+)
+
+# Filename keyword -> store, in priority order (earlier entries win when several match)
+STORE_KEYWORDS = {
+    'lidl': 'lidl',
+    'ah': 'ah',
+    'albert': 'ah',
+    'heijn': 'ah',
+    'jumbo': 'jumbo',
+    'dirk': 'dirk',
+    'hoogvliet': 'hoogvliet',
+    'aldi': 'aldi',
+    'plus': 'plus'
+}
+_STORE_GROUPS = {}
+for _keyword, _store in STORE_KEYWORDS.items():
+    _STORE_GROUPS.setdefault(_store, []).append(re.escape(_keyword))
+# A store's keywords are contiguous in STORE_KEYWORDS, so store order is keyword priority
+_STORE_PRIORITY = {store: i for i, store in enumerate(_STORE_GROUPS)}
+# One named group per store, so m.lastgroup is the store itself. Wrapped in a
+# zero-width lookahead so overlapping keywords (e.g. "aldirk") are all reported.
+_STORE_RE = re.compile(
+    '(?=' + '|'.join(f'(?P<{store}>{"|".join(kws)})' for store, kws in _STORE_GROUPS.items()) + ')'
+)
+del _keyword, _store
+
+
+@functools.lru_cache(maxsize=1024)
+def _detect_store(filename_lower):
+    """Highest-priority store whose keyword occurs in a lowercased filename, or None."""
+    # One scan over the filename finds every keyword; the highest-priority one wins
+    found = [m.lastgroup for m in _STORE_RE.finditer(filename_lower)]
+    if not found:
+        return None
+    return min(found, key=_STORE_PRIORITY.__getitem__)
+
+
+_RECEIPT_EXTENSIONS = ('.jpg', '.png')
+
+
+def _process_one(receipt_path, store_name):
+    """Analyze one receipt in a worker process; logging is left to the parent."""
+    return find_receipt_discrepancies(receipt_path, store_name)
+
 
 class GroceryIntelligenceHub:
     def __init__(self):
@@ -18,6 +70,8 @@ class GroceryIntelligenceHub:
         
     def run_script(self, script_name, args=None, capture_output=False):
         """Run a script with arguments."""
+        import subprocess  # only price/api commands shell out
+
         script_path = self.scripts_dir / script_name
         if not script_path.exists():
             print(f"❌ Script not found: {script_path}")
@@ -58,19 +112,19 @@ class GroceryIntelligenceHub:
         """Generate feedback from receipt."""
         print(f"🧾 Generating feedback for {store_name} receipt: {receipt_path}")
         
-        self.run_script("grocery_feedback.py", ["verify", receipt_path, store_name])
+        analyze_receipt_file(receipt_path, store_name)
 
     def submit_feedback(self):
         """Submit accumulated feedback to community."""
         print("🚀 Submitting feedback to community database...")
 
-        self.run_script("grocery_feedback.py", ["submit"])
+        submit_feedback_to_community()
 
     def feedback_stats(self):
         """Show feedback statistics."""
         print("📊 Feedback Statistics:")
 
-        self.run_script("grocery_feedback.py", ["stats"])
+        show_feedback_stats()
     
     def start_community_api(self):
         """Start community API server."""
@@ -108,21 +162,37 @@ class GroceryIntelligenceHub:
         print(f"📂 Batch processing receipts from: {receipts_dir}")
         
         # Find receipt files
-        receipt_files = list(receipts_dir.glob("*.jpg")) + list(receipts_dir.glob("*.png"))
+        # One directory pass instead of a glob per extension
+        with os.scandir(receipts_dir) as entries:
+            receipt_files = [
+                Path(entry.path) for entry in entries
+                if entry.name.lower().endswith(_RECEIPT_EXTENSIONS) and entry.is_file()
+            ]
         print(f"Found {len(receipt_files)} receipt images")
         
-        for i, receipt_file in enumerate(receipt_files, 1):
-            print(f"\n--- Processing {i}/{len(receipt_files)}: {receipt_file.name} ---")
-            
-            # Try to detect store from filename or ask user
-            store_name = self.detect_store_from_filename(receipt_file.name)
-            if not store_name:
-                print(f"Store name for {receipt_file.name} (or 'skip'): ", end="")
-                store_name = input().strip().lower()
-                if store_name == 'skip':
-                    continue
-            
-            self.generate_feedback(str(receipt_file), store_name)
+        jobs = self._collect_store_assignments(receipt_files)
+        
+        if jobs:
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Receipts are independent: analyze them across cores, then log
+            # everything from the parent so workers never contend on the JSONL file.
+            with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+                futures = [executor.submit(_process_one, path, store) for path, store in jobs]
+                
+                # One feedback entry per receipt, written in file order; each result is awaited in turn
+                for i, ((receipt_path, store_name), future) in enumerate(zip(jobs, futures), 1):
+                    print(f"\n--- Processed {i}/{len(jobs)}: {Path(receipt_path).name} ({store_name}) ---")
+                    try:
+                        discrepancies = future.result()
+                    except Exception as e:
+                        print(f"❌ Could not process {Path(receipt_path).name}: {e}")
+                        continue
+                    if discrepancies is None:
+                        continue  # unreadable receipt
+                    report_discrepancies(discrepancies)
+                    if discrepancies:
+                        submit_feedback_locally(discrepancies)
         
         # Show final stats and offer to submit all
         print(f"\n📊 Batch processing completed ({len(receipt_files)} receipts)")
@@ -132,27 +202,28 @@ class GroceryIntelligenceHub:
         if input().lower().startswith('y'):
             self.submit_feedback()
     
-    def detect_store_from_filename(self, filename):
-        """Try to detect store name from receipt filename."""
-        filename_lower = filename.lower()
+    def _collect_store_assignments(self, receipt_files):
+        """Resolve a store for every receipt before any analysis starts.
         
-        store_keywords = {
-            'lidl': 'lidl',
-            'ah': 'ah',
-            'albert': 'ah',
-            'heijn': 'ah',
-            'jumbo': 'jumbo',
-            'dirk': 'dirk',
-            'hoogvliet': 'hoogvliet',
-            'aldi': 'aldi',
-            'plus': 'plus'
-        }
+        Filenames are tried first; the operator is then asked about the
+        remaining files in one block. Returns (path, store) pairs in the
+        original file order, with skipped files left out.
+        """
+        detected = [self.detect_store_from_filename(f.name) for f in receipt_files]
         
-        for keyword, store in store_keywords.items():
-            if keyword in filename_lower:
-                return store
+        for i, receipt_file in enumerate(receipt_files):
+            if detected[i]:
+                continue
+            print(f"Store name for {receipt_file.name} (or 'skip'): ", end="")
+            store_name = input().strip().lower()
+            if store_name != 'skip':
+                detected[i] = store_name
         
-        return None
+        return [(str(f), store) for f, store in zip(receipt_files, detected) if store]
+    
+    def detect_store_from_filename(self, filename):
+        """Try to detect store name from receipt filename."""
+        return _detect_store(filename.lower())
     
     def interactive_mode(self):
         """Run in interactive mode."""
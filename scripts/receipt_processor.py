@@ -5,32 +5,59 @@ Finds and processes receipt images from Signal/OpenClaw inbound media.
 Uses local Ollama vision model for privacy-first OCR.
 """
 
-import base64
+import codecs
+import fcntl
+import hashlib
+import io
+import itertools
 import json
+import marshal
 import math
+import mmap
 import os
 import re
 import shutil
+import struct
 import subprocess
 import sys
+import threading
+import time
 import urllib.parse
-import urllib.request
+from collections import defaultdict
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
 
+try:
+    import pybase64 as base64  # optional SIMD encoder, drop-in for the stdlib API
+except ImportError:
+    import base64
+
 
 # Grocery Intelligence Integration
-# Catch all exceptions from exec_module — SyntaxError, AttributeError, and other
-# module-level errors must not escape and crash the importer (#6).
-try:
-    import importlib.util
-    spec = importlib.util.spec_from_file_location("grocery_feedback", Path(__file__).parent / "grocery_feedback.py")
-    grocery_feedback = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(grocery_feedback)
-    GROCERY_INTELLIGENCE_AVAILABLE = True
-except Exception as e:
-    print(f"⚠️  Grocery intelligence not available: {e}")
-    GROCERY_INTELLIGENCE_AVAILABLE = False
+# Loaded on first use so CLI commands that never touch it (find, list, ...) skip the import.
+grocery_feedback = None
+GROCERY_INTELLIGENCE_AVAILABLE = None  # unknown until the first load attempt
+
+
+def _load_grocery_feedback():
+    """Import grocery_feedback on first call; returns the module, or None if unavailable."""
+    global grocery_feedback, GROCERY_INTELLIGENCE_AVAILABLE
+    if GROCERY_INTELLIGENCE_AVAILABLE is None:
+        # Catch all exceptions from exec_module — SyntaxError, AttributeError, and other
+        # module-level errors must not escape and crash the importer (#6).
+        try:
+            import importlib.util
+            spec = importlib.util.spec_from_file_location("grocery_feedback", Path(__file__).parent / "grocery_feedback.py")
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            grocery_feedback = module
+            GROCERY_INTELLIGENCE_AVAILABLE = True
+        except Exception as e:
+            print(f"⚠️  Grocery intelligence not available: {e}")
+            GROCERY_INTELLIGENCE_AVAILABLE = False
+    return grocery_feedback
+
 
 STORE_MAPPING = {
     'albert heijn': 'ah', 'ah': 'ah', 'lidl': 'lidl', 'jumbo': 'jumbo',
@@ -58,45 +85,65 @@ def validate_image_path(path_str: str) -> str:
     return str(resolved)
 
 
+# One left-to-right pass: OSC up to BEL, the next ESC or end of string; CSI with a
+# bounded parameter run; then any bare ESC. No pattern can rescan the input.
+_ANSI_RE = re.compile(r'\x1b\][^\x07\x1b]*(?:\x07|\Z)|\x1b\[[0-9;]{0,32}[A-Za-z]|\x1b')
+
+
 def _sanitize_for_display(s: str, max_len: int = 200) -> str:
     """Strip ANSI/VT control sequences and truncate for safe terminal display."""
-    s = re.sub(r'\x1b\][^\x07]*\x07', '', s)      # OSC sequences
-    s = re.sub(r'\x1b\[[0-9;]*[A-Za-z]', '', s)   # CSI sequences
-    s = s.replace('\x1b', '')                       # bare ESC
-    return s[:max_len]
+    return _ANSI_RE.sub('', s)[:max_len]
+
+
+def _case_variants(extensions) -> frozenset:
+    """Every upper/lower-case spelling of the given extensions, so names match without .lower()."""
+    return frozenset(
+        ''.join(chars)
+        for ext in extensions
+        for chars in itertools.product(*({c.lower(), c.upper()} for c in ext))
+    )
+
+
+_IMAGE_EXTENSIONS = _case_variants(('.jpg', '.jpeg', '.png', '.gif', '.webp'))
+_CLEANUP_EXTENSIONS = _case_variants(('.jpg', '.jpeg', '.png'))
+
+
+def _has_extension(name: str, extensions: frozenset) -> bool:
+    """Path.suffix-style check: the text after the last dot, unless the name starts with it."""
+    dot = name.rfind('.')
+    return dot > 0 and name[dot:] in extensions
 
 
 def find_recent_image(max_age_seconds: int = 300) -> dict | None:
     """Find the most recent image in the inbound folder."""
-    now = datetime.now().timestamp()
-    candidates = []
+    now = time.time()
+    best = None
+    best_mtime = -1.0
 
     if not INBOUND_DIR.exists():
         return None
 
-    for f in INBOUND_DIR.iterdir():
-        if f.suffix.lower() in ('.jpg', '.jpeg', '.png', '.gif', '.webp'):
-            # Findings #1/#2: resolve symlinks and verify path stays within INBOUND_DIR
-            try:
-                safe_path = validate_image_path(str(f))
-            except ValueError:
-                continue  # skip symlinks that escape INBOUND_DIR
-            mtime = f.stat().st_mtime
-            age = now - mtime
-            if age <= max_age_seconds:
-                candidates.append({
-                    "path": safe_path,
-                    "filename": f.name,
-                    "age_seconds": int(age),
-                    "mtime": mtime
-                })
-    
-    if not candidates:
+    with os.scandir(INBOUND_DIR) as entries:
+        for entry in entries:
+            if not _has_extension(entry.name, _IMAGE_EXTENSIONS):
+                continue
+            # Findings #1/#2: scandir only yields direct children, so refusing symlinks
+            # is enough to keep every candidate inside INBOUND_DIR
+            if entry.is_symlink():
+                continue
+            mtime = entry.stat().st_mtime
+            if now - mtime <= max_age_seconds and mtime > best_mtime:
+                best, best_mtime = entry, mtime
+
+    if best is None:
         return None
-    
-    # Return most recent
-    candidates.sort(key=lambda x: x["mtime"], reverse=True)
-    return candidates[0]
+
+    return {
+        "path": str(INBOUND_DIR.resolve() / best.name),
+        "filename": best.name,
+        "age_seconds": int(now - best_mtime),
+        "mtime": best_mtime
+    }
 
 
 def run_tesseract(image_path: str) -> str:
@@ -117,15 +164,15 @@ def run_tesseract(image_path: str) -> str:
 OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
 VISION_MODEL = os.environ.get("OLLAMA_VISION_MODEL", "llama3.2-vision:11b")
 
-_MODEL_RE = re.compile(r'^[a-zA-Z0-9._:/-]{1,100}$')
+_MODEL_RE = re.compile(r'\A[a-zA-Z0-9._:/-]{1,100}\Z')
 if not _MODEL_RE.match(VISION_MODEL):
     raise ValueError(f"OLLAMA_VISION_MODEL contains unsafe characters: {VISION_MODEL!r}")
 
 _ALLOWED_OLLAMA_HOSTS = {"localhost", "127.0.0.1"}
 
 
-def _validate_ollama_url(url: str) -> None:
-    """Finding #2: prevent SSRF — Ollama endpoint must be localhost only."""
+def _validate_ollama_url(url: str) -> urllib.parse.ParseResult:
+    """Finding #2: prevent SSRF — Ollama endpoint must be localhost only. Returns the parsed URL."""
     parsed = urllib.parse.urlparse(url)
     if parsed.scheme not in ("http", "https"):
         raise ValueError(f"OLLAMA_URL scheme not allowed: {parsed.scheme!r}")
@@ -133,9 +180,15 @@ def _validate_ollama_url(url: str) -> None:
         raise ValueError(
             f"OLLAMA_URL host not in allowlist (must be localhost or 127.0.0.1): {parsed.hostname!r}"
         )
+    return parsed
 
 
-_validate_ollama_url(OLLAMA_URL)
+# Parsed once here; every request reuses the validated pieces
+_OLLAMA_PARSED = _validate_ollama_url(OLLAMA_URL)
+_OLLAMA_HTTPS = _OLLAMA_PARSED.scheme == "https"
+_OLLAMA_HOST = _OLLAMA_PARSED.hostname
+_OLLAMA_PORT = _OLLAMA_PARSED.port or (443 if _OLLAMA_HTTPS else 80)
+_OLLAMA_PATH = (_OLLAMA_PARSED.path or "/") + (f"?{_OLLAMA_PARSED.query}" if _OLLAMA_PARSED.query else "")
 
 
 _VALID_CATEGORIES = {
@@ -147,6 +200,10 @@ _MAX_STR = 500
 MAX_IMAGE_BYTES = 20 * 1024 * 1024  # 20 MB
 
 
+# \A...\Z rather than ^...$: "$" also matches before a trailing newline
+_ISO_DATE_RE = re.compile(r'\A\d{4}-\d{2}-\d{2}\Z')
+
+
 def _validate_llm_response(parsed: dict) -> dict:
     """Finding #12: enforce schema on LLM output to prevent second-order injection."""
     if not isinstance(parsed, dict):
@@ -157,7 +214,7 @@ def _validate_llm_response(parsed: dict) -> dict:
     if "store" in parsed:
         validated["store"] = _sanitize_for_display(str(parsed["store"]), max_len=_MAX_STR)
     if "date" in parsed:
-        if re.match(r'^\d{4}-\d{2}-\d{2}$', str(parsed["date"])):
+        if _ISO_DATE_RE.match(str(parsed["date"])):
             validated["date"] = parsed["date"]
     if "time" in parsed:
         validated["time"] = _sanitize_for_display(str(parsed["time"]), max_len=10)
@@ -186,16 +243,169 @@ def _validated_int(value: str, min_val: int, max_val: int, default: int) -> int:
         return default
 
 
-def analyze_with_ollama(image_path: str) -> dict:
-    """Analyze receipt image using local Ollama vision model."""
+# Fallback parser for free-text (non-JSON) vision model replies
+_STORE_RE = re.compile(r'\*\*Store\*\*[:\s]+([^\n*]+)', re.I)
+_DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})')
+_TIME_RE = re.compile(r'\*\*Time\*\*[:\s]+(\d{1,2}:\d{2})', re.I)
+_AMOUNT_LABELED_RE = re.compile(r'\*\*Amount\*\*[:\s]+[€]?(\d+[.,]\d{2})', re.I)
+_AMOUNT_ANY_RE = re.compile(r'(\d+[.,]\d{2})')
+
+
+# The vision model tiles images at well under this size, so pixels beyond it are wasted upload
+MODEL_MAX_EDGE = 1600
+_MODEL_JPEG_QUALITY = 85
+
+
+def _downscaled_jpeg(f) -> bytes | None:
+    """Re-encode an oversized image as a JPEG of at most MODEL_MAX_EDGE px.
+    
+    Returns None when Pillow is not installed (it is optional), the image is
+    already small enough, or it cannot be decoded; the caller then sends the
+    original bytes.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    try:
+        with Image.open(f) as img:
+            if max(img.size) <= MODEL_MAX_EDGE:
+                return None
+            # Phone photos carry their rotation in EXIF, which re-encoding would drop
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((MODEL_MAX_EDGE, MODEL_MAX_EDGE), Image.LANCZOS)
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            buf = io.BytesIO()
+            img.save(buf, "JPEG", quality=_MODEL_JPEG_QUALITY, optimize=True)
+            return buf.getvalue()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+# Idle kept-alive connections: sequential requests reuse one socket, and concurrent
+# callers (analyze-full's and batch's worker threads) each check out their own.
+_OLLAMA_IDLE = []
+_OLLAMA_MAX_IDLE = 4
+# Images analyzed in parallel by `batch`; one pooled connection each
+_BATCH_CONCURRENCY = _OLLAMA_MAX_IDLE
+_OLLAMA_LOCK = threading.Lock()
+
+
+def _ollama_post(body: bytes) -> bytes:
+    """POST a JSON body to OLLAMA_URL and return the raw reply, reconnecting if the connection went stale."""
+    import http.client  # only analyze talks HTTP; keep the other commands' startup lean
+
+    for attempt in range(2):
+        with _OLLAMA_LOCK:
+            conn = _OLLAMA_IDLE.pop() if _OLLAMA_IDLE else None
+        reused = conn is not None
+        if not reused:
+            conn_cls = http.client.HTTPSConnection if _OLLAMA_HTTPS else http.client.HTTPConnection
+            conn = conn_cls(_OLLAMA_HOST, _OLLAMA_PORT, timeout=120)
+        try:
+            conn.request("POST", _OLLAMA_PATH, body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            data = response.read()  # drain fully so the connection can carry the next request
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if reused and attempt == 0:
+                # The server closed an idle kept-alive connection, so the other idle
+                # ones are most likely dead too: drop them and retry on a fresh one
+                with _OLLAMA_LOCK:
+                    stale = _OLLAMA_IDLE[:]
+                    _OLLAMA_IDLE.clear()
+                for idle in stale:
+                    idle.close()
+                continue
+            raise
+        except Exception:
+            conn.close()
+            raise
+        with _OLLAMA_LOCK:
+            if response.will_close or len(_OLLAMA_IDLE) >= _OLLAMA_MAX_IDLE:
+                conn.close()
+            else:
+                _OLLAMA_IDLE.append(conn)
+        if not 200 <= response.status < 300:
+            raise http.client.HTTPException(f"HTTP {response.status}")
+        return data
+
+
+# Bump when the prompt or the shape of cached analyses changes
+_VISION_CACHE_FORMAT = 1
+
+
+def _vision_cache_dir() -> Path:
+    """One JSON file per analyzed image, next to the receipts folder."""
+    return RECEIPTS_DIR.parent / ".vision_cache"
+
+
+def _vision_cache_key(f, file_size: int) -> str:
+    """blake2b over the model name and the image bytes, so a new model never reuses old results."""
+    h = hashlib.blake2b(f"{_VISION_CACHE_FORMAT}\0{VISION_MODEL}\0".encode("utf-8"), digest_size=16)
+    if file_size:
+        with mmap.mmap(f.fileno(), file_size, access=mmap.ACCESS_READ) as mm:
+            h.update(mm)
+    return h.hexdigest()
+
+
+def _lookup_vision(key: str):
+    """Cached analysis for this key, or None."""
+    try:
+        cached = json.loads((_vision_cache_dir() / f"{key}.json").read_bytes())
+        # Finding #12: the file is outside our control once written, so validate it like LLM output
+        return _validate_llm_response(cached)
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _store_vision(key: str, analysis: dict) -> None:
+    """Persist an analysis atomically; an unwritable folder just skips the cache."""
+    cache_dir = _vision_cache_dir()
+    target = cache_dir / f"{key}.json"
+    tmp = target.with_name(target.name + ".tmp")
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(analysis, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, target)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def analyze_with_ollama(image_path: str, use_cache: bool = True) -> dict:
+    """Analyze receipt image using local Ollama vision model, reusing the result for a known image."""
 
     # Read and encode image — enforce size cap before reading into memory
     file_size = os.stat(image_path).st_size
     if file_size > MAX_IMAGE_BYTES:
         raise ValueError(f"Image too large: {file_size} bytes (max {MAX_IMAGE_BYTES})")
     with open(image_path, "rb") as f:
-        img_base64 = base64.b64encode(f.read()).decode("utf-8")
-    
+        # Inference takes seconds; hashing the same bytes takes milliseconds
+        key = _vision_cache_key(f, file_size) if use_cache else None
+        if key is not None:
+            cached = _lookup_vision(key)
+            if cached is not None:
+                return cached
+        downscaled = _downscaled_jpeg(f)
+        if downscaled is not None:
+            img_base64 = base64.b64encode(downscaled)
+        elif file_size:
+            # Map exactly the size that passed the cap and encode straight from the page
+            # cache, so the raw bytes never need a second copy on the Python heap.
+            with mmap.mmap(f.fileno(), file_size, access=mmap.ACCESS_READ) as mm:
+                img_base64 = base64.b64encode(mm)
+        else:
+            img_base64 = b""  # mmap cannot map an empty file
+
+    analysis = _analyze_encoded(img_base64)
+    if key is not None and "error" not in analysis:
+        _store_vision(key, analysis)
+    return analysis
+
+
+def _analyze_encoded(img_base64: bytes) -> dict:
+    """Send one base64-encoded image to Ollama and validate what comes back."""
     prompt = """Look at this receipt image. Extract the purchased items - these are lines with a quantity (Hvl/Aantal), product name, and price. 
 IGNORE: BTW details, loyalty cards, totals, payment info, store info.
 
@@ -211,65 +421,62 @@ If not a receipt: {"is_receipt":false}"""
     payload = {
         "model": VISION_MODEL,
         "prompt": prompt,
-        "images": [img_base64],
         "stream": False,
         "options": {"temperature": 0.1}
     }
-    
-    req = urllib.request.Request(
-        OLLAMA_URL,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json"}
-    )
+    # Base64 is plain ASCII that needs no JSON escaping, so splice the bytes in as the
+    # last key instead of round-tripping a multi-MB str through the encoder.
+    body = b"".join((
+        json.dumps(payload)[:-1].encode("utf-8"), b', "images": ["', img_base64, b'"]}'
+    ))
     
     try:
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            result = json.loads(resp.read().decode("utf-8"))
-            response_text = result.get("response", "")
-
-            # Try to extract JSON from response
-            start = response_text.find("{")
-            end = response_text.rfind("}") + 1
-            if start >= 0 and end > start:
-                json_str = response_text[start:end]
-                try:
-                    # Finding #12: validate LLM output before returning
-                    return _validate_llm_response(json.loads(json_str))
-                except (json.JSONDecodeError, ValueError):
-                    pass
-
-            # Fallback: parse structured text response
-            parsed = {"is_receipt": True, "raw": response_text}
-
-            # Extract store
-            store_match = re.search(r'\*\*Store\*\*[:\s]+([^\n*]+)', response_text, re.I)
-            if store_match:
-                parsed["store"] = store_match.group(1).strip()[:200]
-
-            # Extract date
-            date_match = re.search(r'(\d{4}-\d{2}-\d{2})', response_text)
-            if date_match:
-                parsed["date"] = date_match.group(1)
-
-            # Extract time
-            time_match = re.search(r'\*\*Time\*\*[:\s]+(\d{1,2}:\d{2})', response_text, re.I)
-            if time_match:
-                parsed["time"] = time_match.group(1)
-
-            # Extract amount
-            amount_match = re.search(r'\*\*Amount\*\*[:\s]+[€]?(\d+[.,]\d{2})', response_text, re.I)
-            if not amount_match:
-                amount_match = re.search(r'(\d+[.,]\d{2})', response_text)
-            if amount_match:
-                raw_amount = float(amount_match.group(1).replace(",", "."))
-                if math.isfinite(raw_amount) and 0 <= raw_amount <= 100_000:
-                    parsed["amount"] = raw_amount
-
-            # Finding #3: route fallback through the same schema validator as the primary path
+        result = json.loads(_ollama_post(body).decode("utf-8"))
+        response_text = result.get("response", "")
+
+        # Try to extract JSON from response
+        start = response_text.find("{")
+        end = response_text.rfind("}") + 1
+        if start >= 0 and end > start:
+            json_str = response_text[start:end]
             try:
-                return _validate_llm_response(parsed)
-            except (ValueError, TypeError):
-                return {"is_receipt": False, "error": "Could not parse LLM response into valid receipt schema"}
+                # Finding #12: validate LLM output before returning
+                return _validate_llm_response(json.loads(json_str))
+            except (json.JSONDecodeError, ValueError):
+                pass
+
+        # Fallback: parse structured text response
+        parsed = {"is_receipt": True, "raw": response_text}
+
+        # Extract store
+        store_match = _STORE_RE.search(response_text)
+        if store_match:
+            parsed["store"] = store_match.group(1).strip()[:200]
+
+        # Extract date
+        date_match = _DATE_RE.search(response_text)
+        if date_match:
+            parsed["date"] = date_match.group(1)
+
+        # Extract time
+        time_match = _TIME_RE.search(response_text)
+        if time_match:
+            parsed["time"] = time_match.group(1)
+
+        # Extract amount
+        amount_match = _AMOUNT_LABELED_RE.search(response_text)
+        if not amount_match:
+            amount_match = _AMOUNT_ANY_RE.search(response_text)
+        if amount_match:
+            raw_amount = float(amount_match.group(1).replace(",", "."))
+            if math.isfinite(raw_amount) and 0 <= raw_amount <= 100_000:
+                parsed["amount"] = raw_amount
+
+        # Finding #3: route fallback through the same schema validator as the primary path
+        try:
+            return _validate_llm_response(parsed)
+        except (ValueError, TypeError):
+            return {"is_receipt": False, "error": "Could not parse LLM response into valid receipt schema"}
 
     except Exception as exc:
         # Don't leak internal IP or error details to caller; log to stderr for diagnostics
@@ -277,6 +484,86 @@ If not a receipt: {"is_receipt":false}"""
         return {"error": "Analysis service unavailable"}
 
 
+# receipts.idx: one little-endian u64 byte offset per JSONL line, so the most
+# recent records can be read without scanning the log.
+_OFFSET = struct.Struct("<Q")
+
+
+def _receipts_index_file() -> Path:
+    return RECEIPTS_JSONL.with_name("receipts.idx")
+
+
+def _append_receipt_line(line: bytes) -> None:
+    with open(RECEIPTS_JSONL, "ab") as f:
+        # Exclusive lock so concurrent saves cannot interleave offsets and lines
+        fcntl.flock(f, fcntl.LOCK_EX)
+        offset = f.seek(0, os.SEEK_END)
+        f.write(line)
+        f.flush()
+        with open(_receipts_index_file(), "ab") as idx:
+            idx.write(_OFFSET.pack(offset))
+
+
+# Buffer for sequential whole-log scans; seek-and-read paths keep the small default
+_SCAN_BUFFER = 64 * 1024
+
+
+def _rebuild_receipts_index() -> None:
+    """Index every line of the log, e.g. one written before receipts.idx existed."""
+    index_file = _receipts_index_file()
+    tmp = index_file.with_name(index_file.name + ".tmp")
+    try:
+        with open(RECEIPTS_JSONL, "rb", buffering=_SCAN_BUFFER) as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            offsets = bytearray()
+            offset = 0
+            for line in f:
+                offsets += _OFFSET.pack(offset)
+                offset += len(line)
+            tmp.write_bytes(offsets)
+            os.replace(tmp, index_file)
+    except OSError:
+        pass  # listing falls back to a tail read
+
+
+def _indexed_records(f, size: int, limit: int):
+    """Most recent `limit` records via receipts.idx, or None if the index does not cover the log."""
+    try:
+        idx = open(_receipts_index_file(), "rb")
+    except OSError:
+        return None
+    with idx:
+        count = os.fstat(idx.fileno()).st_size // _OFFSET.size
+        if not count:
+            return None
+        with mmap.mmap(idx.fileno(), count * _OFFSET.size, access=mmap.ACCESS_READ) as mm:
+            if _OFFSET.unpack_from(mm, 0)[0] != 0:
+                return None  # lines before the index existed are not covered
+            records = []
+            end = size
+            for i in range(count - 1, -1, -1):
+                start = _OFFSET.unpack_from(mm, i * _OFFSET.size)[0]
+                if start >= end:
+                    return None
+                f.seek(start)
+                line = f.read(end - start)
+                end = start
+                if b"\n" in line[:-1]:
+                    return None  # lines were appended without being indexed
+                if not line.strip():
+                    continue
+                try:
+                    record = _parse_line(line)
+                except ValueError:
+                    continue  # skip malformed lines (#3)
+                if not isinstance(record, dict):
+                    continue  # e.g. a stray list or number line
+                records.append(record)
+                if len(records) == limit:
+                    break
+            return records
+
+
 def save_receipt(receipt_data: dict, image_path: str) -> dict:
     """
     Save receipt to JSONL and copy image to receipts folder.
@@ -290,27 +577,32 @@ def save_receipt(receipt_data: dict, image_path: str) -> dict:
     """
     src = Path(image_path)
     ext = src.suffix.lower()
-    _SAFE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
-    if ext not in _SAFE_EXTENSIONS:
+    if ext not in _IMAGE_EXTENSIONS:
         raise ValueError(f"Unsupported image extension: {ext!r}")
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    # Nanosecond suffix keeps receipts saved within the same second from overwriting each other
+    ns = time.time_ns()
+    seconds, fraction = divmod(ns, 1_000_000_000)
+    timestamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(seconds)) + f"-{fraction:09d}"
     new_filename = f"receipt-{timestamp}{ext}"
     dest_path = RECEIPTS_DIR / new_filename
 
-    # Copy image
-    shutil.copy2(src, dest_path)
+    # Hard-link the image when both folders share a filesystem; otherwise copy it
+    try:
+        os.link(src, dest_path)
+    except OSError:
+        shutil.copyfile(src, dest_path)
+        shutil.copystat(src, dest_path)
     
     # Build record
     record = {
         **receipt_data,
         "image_file": new_filename,
         "original_file": src.name,
-        "processed_at": datetime.now().isoformat()
+        "processed_at": datetime.fromtimestamp(seconds).replace(microsecond=fraction // 1000).isoformat()
     }
     
-    # Append to JSONL
-    with open(RECEIPTS_JSONL, "a") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    # Append to JSONL, and the record's byte offset to the index in lockstep
+    _append_receipt_line((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
     
     return {
         "saved": True,
@@ -330,43 +622,96 @@ def cmd_find(args):
         sys.exit(1)
 
 
-def cmd_analyze(args):
-    """Analyze image with Ollama vision model."""
+def _image_path_from_args(args) -> str:
+    """Validated image path from the CLI args, or the most recent inbound image."""
     if not args:
         # Find most recent
         result = find_recent_image(3600)
         if not result:
             print(json.dumps({"error": "No recent image found"}))
             sys.exit(1)
-        image_path = result["path"]
-    else:
-        try:
-            image_path = validate_image_path(args[0])
-        except ValueError as e:
-            print(json.dumps({"error": str(e)}))
-            sys.exit(1)
+        return result["path"]
+    try:
+        return validate_image_path(args[0])
+    except ValueError as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+
+def _cache_flag(args):
+    """Split off --no-cache: returns (remaining args, whether the vision cache may be used)."""
+    return [a for a in args if a != "--no-cache"], "--no-cache" not in args
+
+
+def cmd_analyze(args):
+    """Analyze image with Ollama vision model."""
+    args, use_cache = _cache_flag(args)
+    image_path = _image_path_from_args(args)
 
     print(f"Analyzing {image_path} with {VISION_MODEL}...", file=sys.stderr)
-    analysis = analyze_with_ollama(image_path)
+    analysis = analyze_with_ollama(image_path, use_cache)
     analysis["image_path"] = image_path
     print(json.dumps(analysis, indent=2))
 
 
+def cmd_analyze_full(args):
+    """Analyze image with Ollama and run Tesseract OCR on it concurrently."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    args, use_cache = _cache_flag(args)
+    image_path = _image_path_from_args(args)
+
+    print(f"Analyzing {image_path} with {VISION_MODEL} + Tesseract...", file=sys.stderr)
+    # Both threads mostly wait (HTTP socket, OCR subprocess), so wall time is the slower of the two
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        ocr_future = executor.submit(run_tesseract, image_path)
+        analysis = executor.submit(analyze_with_ollama, image_path, use_cache).result()
+        try:
+            analysis["ocr_text"] = ocr_future.result()
+        except (OSError, RuntimeError) as e:
+            analysis["ocr_error"] = str(e)
+    analysis["image_path"] = image_path
+    print(json.dumps(analysis, indent=2))
+
+
+def _analyze_batch_item(image_path: str, use_cache: bool = True) -> dict:
+    """Analyze one image of a batch, reporting per-image failures instead of aborting the batch."""
+    try:
+        analysis = analyze_with_ollama(image_path, use_cache)
+    except (OSError, ValueError) as e:
+        analysis = {"error": str(e)}
+    analysis["image_path"] = image_path
+    return analysis
+
+
+def cmd_batch(args):
+    """Analyze every image in the inbound folder (oldest first, up to N), several at a time."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    args, use_cache = _cache_flag(args)
+    max_images = _validated_int(args[0], 1, 1000, 50) if args else 50
+    images = []
+    if INBOUND_DIR.exists():
+        inbound_dir = INBOUND_DIR.resolve()
+        with os.scandir(INBOUND_DIR) as entries:
+            for entry in entries:
+                # Findings #1/#2: direct children only, and no symlinks out of INBOUND_DIR
+                if _has_extension(entry.name, _IMAGE_EXTENSIONS) and not entry.is_symlink():
+                    images.append((entry.stat().st_mtime, str(inbound_dir / entry.name)))
+    images = [path for _, path in sorted(images)[:max_images]]
+
+    print(f"Analyzing {len(images)} images with {VISION_MODEL}...", file=sys.stderr)
+    results = []
+    if images:
+        # Each worker mostly waits on its own Ollama request, so they overlap on the server
+        with ThreadPoolExecutor(max_workers=min(_BATCH_CONCURRENCY, len(images))) as executor:
+            results = list(executor.map(_analyze_batch_item, images, itertools.repeat(use_cache)))
+    print(json.dumps({"results": results, "total": len(results)}, indent=2))
+
+
 def cmd_ocr(args):
     """Run OCR on an image."""
-    if not args:
-        # Find most recent
-        result = find_recent_image(3600)
-        if not result:
-            print(json.dumps({"error": "No recent image found"}))
-            sys.exit(1)
-        image_path = result["path"]
-    else:
-        try:
-            image_path = validate_image_path(args[0])
-        except ValueError as e:
-            print(json.dumps({"error": str(e)}))
-            sys.exit(1)
+    image_path = _image_path_from_args(args)
 
     text = run_tesseract(image_path)
     print(json.dumps({
@@ -440,6 +785,183 @@ def cmd_save(args):
     print(json.dumps(saved, indent=2))
 
 
+_JSON_DECODE = json.JSONDecoder().decode
+
+
+def _parse_line(line: bytes):
+    """json.loads for one UTF-8 JSONL line, without the per-call encoding detection of bytes input."""
+    if line.startswith(codecs.BOM_UTF8):
+        line = line[len(codecs.BOM_UTF8):]
+    return _JSON_DECODE(line.decode("utf-8", "surrogatepass"))
+
+
+# Snapshot of the cmd_stats aggregates for the first `covered_bytes` of the JSONL.
+# The log is append-only, so later calls only parse what was appended since.
+_STATS_CACHE_FORMAT = 1
+_STATS_CHECK_BYTES = 64
+
+
+def _stats_cache_file() -> Path:
+    return RECEIPTS_JSONL.with_name(RECEIPTS_JSONL.name + ".cache")
+
+
+# "€12,50" -> "12.50" in one pass: drop the euro sign, decimal comma to point
+_EURO_AMOUNT = str.maketrans({"€": None, ",": "."})
+
+
+def _fold_receipts(agg: dict, lines) -> None:
+    """Add JSONL lines to the running aggregates (blank, malformed and non-object lines are skipped)."""
+    parse = _parse_line
+    isfinite = math.isfinite
+    receipts = agg["receipts"]
+    total_amount = agg["total_amount"]
+    # int default keeps integer-only sums printing as before (0 + amount)
+    by_store = defaultdict(int, agg["by_store"])
+    by_category = defaultdict(int, agg["by_category"])
+    
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            r = parse(line)
+        except ValueError:
+            continue  # skip malformed lines (#3)
+        if not isinstance(r, dict):
+            continue  # e.g. a stray list or number line
+        receipts += 1
+        
+        amount = r.get("amount", 0)
+        try:
+            finite = isfinite(amount)
+        except TypeError:
+            # Rare: parse "€12.50" format only once the numeric check has failed
+            if not isinstance(amount, str):
+                continue
+            try:
+                amount = float(amount.translate(_EURO_AMOUNT).strip())
+            except ValueError:
+                continue
+            finite = isfinite(amount)
+        # Finding #5: skip corrupted/non-finite amounts rather than poisoning totals
+        if not (finite and 0.0 <= amount <= 100_000.0):
+            continue
+        total_amount += amount
+        by_store[r.get("store", "Unknown")] += amount
+        by_category[r.get("category", "Uncategorized")] += amount
+    
+    agg["receipts"] = receipts
+    agg["total_amount"] = total_amount
+    agg["by_store"] = dict(by_store)  # plain dicts: the snapshot is marshalled
+    agg["by_category"] = dict(by_category)
+
+
+def _stats_checkpoint(f, covered: int) -> tuple:
+    """Bytes at the start of the file and just before `covered`, to detect a rewritten log."""
+    f.seek(0)
+    head = f.read(min(covered, _STATS_CHECK_BYTES))
+    f.seek(max(0, covered - _STATS_CHECK_BYTES))
+    return head, f.read(min(covered, _STATS_CHECK_BYTES))
+
+
+def _load_stats_cache(f, size: int):
+    """Return (aggregates, covered_bytes) if the snapshot still describes a prefix of the log."""
+    try:
+        with open(_stats_cache_file(), "rb") as fh:
+            cache = marshal.loads(fh.read())
+        covered = cache["covered_bytes"]
+        if cache["format"] != _STATS_CACHE_FORMAT or not 0 < covered <= size:
+            return None
+        if _stats_checkpoint(f, covered) != cache["checkpoint"]:
+            return None
+        return cache["aggregates"], covered
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        return None
+
+
+def _save_stats_cache(f, agg: dict, covered: int) -> None:
+    cache = {
+        "format": _STATS_CACHE_FORMAT,
+        "covered_bytes": covered,
+        "checkpoint": _stats_checkpoint(f, covered),
+        "aggregates": agg,
+    }
+    cache_file = _stats_cache_file()
+    tmp = cache_file.with_name(cache_file.name + ".tmp")
+    try:
+        tmp.write_bytes(marshal.dumps(cache))
+        os.replace(tmp, cache_file)
+    except (OSError, ValueError):
+        pass  # the snapshot is only an optimization
+
+
+def _receipt_aggregates() -> dict:
+    """Aggregate all saved receipts, parsing only lines appended since the last snapshot."""
+    with open(RECEIPTS_JSONL, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        cached = _load_stats_cache(f, size)
+        if cached:
+            agg, start = cached
+        else:
+            agg = {"receipts": 0, "total_amount": 0, "by_store": {}, "by_category": {}}
+            start = 0
+        
+        f.seek(start)
+        covered = [start]
+        unterminated = []
+        
+        def complete_lines():
+            for line in f:
+                if not line.endswith(b"\n"):
+                    unterminated.append(line)
+                    return
+                covered[0] += len(line)
+                yield line
+        
+        _fold_receipts(agg, complete_lines())
+        
+        if covered[0] > start:
+            _save_stats_cache(f, agg, covered[0])
+        if unterminated:
+            # An unterminated last line may still be being written: count it, don't snapshot it
+            _fold_receipts(agg, unterminated)
+    return agg
+
+
+_TAIL_WINDOW = 64 * 1024
+
+
+def _tail_records(f, size: int, limit: int) -> list:
+    """Parse the last `limit` valid JSONL records of a binary file, most recent first."""
+    window = _TAIL_WINDOW
+    while True:
+        start = max(0, size - window)
+        f.seek(start)
+        lines = f.read(size - start).split(b"\n")
+        if start > 0:
+            lines = lines[1:]  # the first line of a window may be cut off
+        records = []
+        for line in reversed(lines):
+            if not line.strip():
+                continue
+            try:
+                record = _parse_line(line)
+            except ValueError:
+                continue  # skip malformed lines (#3)
+            if not isinstance(record, dict):
+                continue  # e.g. a stray list or number line
+            records.append(record)
+            if len(records) == limit:
+                return records
+        if start == 0:
+            return records
+        window *= 4  # not enough complete records in the window yet
+
+
+def _print_listing(obj) -> None:
+    """Print list/stats output: indented for a terminal, compact when piped to another program."""
+    print(json.dumps(obj, indent=2 if sys.stdout.isatty() else None))
+
+
 def cmd_list(args):
     """List saved receipts."""
     limit = _validated_int(args[0], 1, 10_000, 10) if args else 10
@@ -448,24 +970,23 @@ def cmd_list(args):
         print(json.dumps({"receipts": [], "total": 0}))
         return
     
-    receipts = []
-    with open(RECEIPTS_JSONL) as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                receipts.append(json.loads(line))
-            except json.JSONDecodeError:
-                continue  # skip malformed lines (#3)
-
-    # Most recent first
-    receipts.reverse()
+    with open(RECEIPTS_JSONL, "rb") as f:
+        # Most recent first: seek straight to the last records via the offset index
+        size = f.seek(0, os.SEEK_END)
+        receipts = _indexed_records(f, size, limit)
+        if receipts is None:
+            receipts = _tail_records(f, size, limit)
+            _rebuild_receipts_index()
     
-    print(json.dumps({
-        "receipts": receipts[:limit],
-        "total": len(receipts)
-    }, indent=2))
+    _print_listing({
+        "receipts": receipts,
+        "total": _receipt_aggregates()["receipts"]
+    })
+
+
+def _rounded_by_total(totals: dict) -> dict:
+    """Totals rounded to cents, largest first; equal totals keep their first-seen order."""
+    return {k: round(v, 2) for k, v in sorted(totals.items(), key=itemgetter(1), reverse=True)}
 
 
 def cmd_stats(args):
@@ -474,62 +995,36 @@ def cmd_stats(args):
         print(json.dumps({"total": 0, "total_amount": 0}))
         return
     
-    receipts = []
-    with open(RECEIPTS_JSONL) as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                receipts.append(json.loads(line))
-            except json.JSONDecodeError:
-                continue  # skip malformed lines (#3)
-
-    total_amount = 0
-    by_store = {}
-    by_category = {}
-    
-    for r in receipts:
-        amount = r.get("amount", 0)
-        if isinstance(amount, str):
-            # Parse "€12.50" format
-            amount = float(amount.replace("€", "").replace(",", ".").strip())
-        # Finding #5: skip corrupted/non-finite amounts rather than poisoning totals
-        if not (math.isfinite(amount) and 0.0 <= amount <= 100_000.0):
-            continue
-        total_amount += amount
-        
-        store = r.get("store", "Unknown")
-        by_store[store] = by_store.get(store, 0) + amount
-        
-        category = r.get("category", "Uncategorized")
-        by_category[category] = by_category.get(category, 0) + amount
-    
-    print(json.dumps({
-        "total_receipts": len(receipts),
-        "total_amount": round(total_amount, 2),
-        "by_store": {k: round(v, 2) for k, v in sorted(by_store.items(), key=lambda x: -x[1])},
-        "by_category": {k: round(v, 2) for k, v in sorted(by_category.items(), key=lambda x: -x[1])}
-    }, indent=2))
+    agg = _receipt_aggregates()
+    _print_listing({
+        "total_receipts": agg["receipts"],
+        "total_amount": round(agg["total_amount"], 2),
+        "by_store": _rounded_by_total(agg["by_store"]),
+        "by_category": _rounded_by_total(agg["by_category"])
+    })
 
 
 def cmd_cleanup(args):
     """Remove receipt images older than N days (default 30). Keeps JSONL data."""
     max_days = _validated_int(args[0], 1, 365, 30) if args else 30
-    now = datetime.now().timestamp()
+    now = time.time()
     max_age = max_days * 24 * 60 * 60
     
     removed = []
     kept = []
     
-    for f in RECEIPTS_DIR.iterdir():
-        if f.suffix.lower() in ('.jpg', '.jpeg', '.png'):
-            age = now - f.stat().st_mtime
+    # DirEntry names need no Path objects, and the stat is one call per candidate
+    with os.scandir(RECEIPTS_DIR) as entries:
+        for entry in entries:
+            name = entry.name
+            if not _has_extension(name, _CLEANUP_EXTENSIONS):
+                continue
+            age = now - entry.stat().st_mtime
             if age > max_age:
-                f.unlink()
-                removed.append(f.name)
+                os.unlink(entry.path)
+                removed.append(name)
             else:
-                kept.append(f.name)
+                kept.append(name)
     
     print(json.dumps({
         "removed": len(removed),
@@ -542,14 +1037,13 @@ def cmd_cleanup(args):
 
 def generate_grocery_intelligence(receipt_data):
     """Generate grocery intelligence feedback from receipt data."""
-    if not GROCERY_INTELLIGENCE_AVAILABLE:
+    if _load_grocery_feedback() is None:
         return
     
-    store_name = receipt_data.get('store', '').lower()
-    if store_name not in STORE_MAPPING:
+    mapped_store = STORE_MAPPING.get(receipt_data.get('store', '').lower())
+    if mapped_store is None:
         return  # Not a grocery store
     
-    mapped_store = STORE_MAPPING[store_name]
     items = receipt_data.get('items', [])
     
     # Extract items with prices
@@ -588,34 +1082,41 @@ def generate_grocery_intelligence(receipt_data):
 
 
 
+GROCERY_ONLY_KEYWORDS = [
+    "grocery scan", "price scan", "grocery only", "price only",
+    "no expense", "market research", "just prices", "prijscan"
+]
+# One scan of the message for any keyword instead of a substring search per keyword
+_GROCERY_ONLY_RE = re.compile("|".join(map(re.escape, GROCERY_ONLY_KEYWORDS)))
+
+
 def detect_grocery_only_mode():
     """Check if this should be grocery-only mode (no expense tracking)."""
     # Check for recent Signal messages with grocery-only keywords
     try:
         # Look for recent inbound media with grocery-only indicators
-        inbound_dir = (Path.home() / ".openclaw" / "media" / "inbound").resolve()
+        inbound_dir = INBOUND_DIR.resolve()
 
         # Check if there's a recent message file with grocery keywords
+        now = time.time()
         recent_files = []
-        for f in inbound_dir.glob("*.json"):
-            try:
-                f.resolve().relative_to(inbound_dir)
-            except ValueError:
-                continue  # skip symlinks escaping inbound_dir
-            if (datetime.now().timestamp() - f.stat().st_mtime) < 300:  # 5 minutes
-                recent_files.append(f)
-        
-        grocery_keywords = [
-            "grocery scan", "price scan", "grocery only", "price only",
-            "no expense", "market research", "just prices", "prijscan"
-        ]
+        with os.scandir(inbound_dir) as entries:
+            for entry in entries:
+                # Direct children only, and no symlinks that could lead outside inbound_dir
+                if not entry.name.endswith(".json") or not entry.is_file(follow_symlinks=False):
+                    continue
+                mtime = entry.stat(follow_symlinks=False).st_mtime
+                if (now - mtime) < 300:  # 5 minutes
+                    recent_files.append((mtime, entry.path))
         
-        for msg_file in recent_files:
+        # Newest first: the message that triggered this run is the likeliest match
+        recent_files.sort(reverse=True)
+        for _, msg_file in recent_files:
             try:
                 with open(msg_file) as f:
                     msg_data = json.load(f)
                     msg_text = msg_data.get("text", "").lower()
-                    if any(keyword in msg_text for keyword in grocery_keywords):
+                    if _GROCERY_ONLY_RE.search(msg_text):
                         print("🛒 Detected grocery-only mode from Signal message")
                         return True
             except (json.JSONDecodeError, KeyError):
@@ -630,7 +1131,7 @@ def detect_grocery_only_mode():
 def main():
     if len(sys.argv) < 2:
         print("Usage: receipt_processor.py <command> [args]")
-        print("Commands: find, analyze, ocr, save, list, stats, cleanup")
+        print("Commands: find, analyze, analyze-full, batch, ocr, save, list, stats, cleanup")
         sys.exit(1)
     
     cmd = sys.argv[1]
@@ -639,6 +1140,8 @@ def main():
     commands = {
         "find": cmd_find,
         "analyze": cmd_analyze,
+        "analyze-full": cmd_analyze_full,
+        "batch": cmd_batch,
         "ocr": cmd_ocr,
         "save": cmd_save,
         "list": cmd_list,
@@ -11,17 +11,25 @@ Usage:
 """
 
 import argparse
+import array
 import hashlib
+import heapq
 import json
+import marshal
 import os
 import re
 import ssl
+import struct
 import sys
 import time
 from pathlib import Path
 from datetime import datetime, timedelta
+from operator import itemgetter
+import urllib.error
 import urllib.request
 
+from fast_json import loads as _loads
+
 CACHE_DIR = Path.home() / ".openclaw/workspace/data"
 CACHE_FILE = CACHE_DIR / "supermarkets-cache.json"
 
@@ -53,20 +61,153 @@ STORE_NAMES = {
 # Default stores for Default family (budget > nearby > convenient)
 DEFAULT_STORES = ["dirk", "lidl", "hoogvliet", "ah", "jumbo"]
 
+# Bump when the layout of the parsed snapshot changes
+_SNAPSHOT_FORMAT = 2
+_SNAPSHOT_HEADER_LEN = struct.Struct("<Q")
+
+
+def _snapshot_file():
+    """Parsed copy of CACHE_FILE that loads without re-decoding the JSON."""
+    return CACHE_FILE.with_name("supermarkets-cache.bin")
+
+
+def _cache_signature():
+    """Return (mtime_ns, size) of CACHE_FILE, or None if it is missing."""
+    try:
+        st = CACHE_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _lowercase_names(store_data):
+    """Store each product's lowercased name as "_nl" so searches never lowercase per query."""
+    for products in store_data.values():
+        for product in products:
+            product["_nl"] = product.get("n", "").lower()
+
+
+def _lower_name(product):
+    """Lowercased product name, precomputed as "_nl" when the data came from the snapshot."""
+    name = product.get("_nl")
+    if name is None:
+        name = product.get("n", "").lower()
+    return name
+
+
+def _read_snapshot_header(f, signature):
+    """Header of an open snapshot if it was built from this CACHE_FILE signature, else None.
+
+    Layout: 8-byte header length, marshal'd header {format, signature, source,
+    etag, sections: {name: (offset, length)}}, then the marshal'd sections: the
+    cache itself and one search index per store, so the header and each index
+    can be read without loading the rest.
+    """
+    (header_len,) = _SNAPSHOT_HEADER_LEN.unpack(f.read(_SNAPSHOT_HEADER_LEN.size))
+    if header_len > os.fstat(f.fileno()).st_size:
+        return None  # not a snapshot in this layout (e.g. an older format)
+    header = marshal.loads(f.read(header_len))
+    if not isinstance(header, dict):
+        return None
+    if header.get("format") != _SNAPSHOT_FORMAT or header.get("signature") != signature:
+        return None
+    header["start"] = _SNAPSHOT_HEADER_LEN.size + header_len
+    return header
+
+
+def _read_snapshot_section(f, header, name):
+    offset, length = header["sections"][name]
+    f.seek(header["start"] + offset)
+    return marshal.loads(f.read(length))
+
+
+def _snapshot_header(signature):
+    """Return the snapshot header for this CACHE_FILE signature without loading any section."""
+    try:
+        with open(_snapshot_file(), "rb") as f:
+            return _read_snapshot_header(f, signature)
+    except (OSError, EOFError, ValueError, TypeError, struct.error):
+        return None
+
+
+def _read_snapshot(signature):
+    """Return the cache dict from the snapshot if it was built from this CACHE_FILE signature."""
+    try:
+        with open(_snapshot_file(), "rb") as f:
+            header = _read_snapshot_header(f, signature)
+            if header is None:
+                return None
+            cache = _read_snapshot_section(f, header, "cache")
+    except (OSError, EOFError, ValueError, TypeError, KeyError, struct.error):
+        return None
+    return cache if isinstance(cache, dict) else None
+
+
+def _read_search_index(signature, store_key):
+    """Return one store's search index from the snapshot if it was built from this signature."""
+    try:
+        with open(_snapshot_file(), "rb") as f:
+            header = _read_snapshot_header(f, signature)
+            if header is None:
+                return None
+            index = _read_snapshot_section(f, header, ("search", store_key))
+    except (OSError, EOFError, ValueError, TypeError, KeyError, struct.error):
+        return None
+    return index if isinstance(index, dict) else None
+
+
+def _write_snapshot(signature, cache):
+    """Persist the parsed cache atomically; a read-only data dir just skips the snapshot."""
+    snapshot = _snapshot_file()
+    tmp = snapshot.with_name(snapshot.name + ".tmp")
+    try:
+        # Tokenized here, once per downloaded catalog, rather than by every search
+        blobs = {"cache": marshal.dumps(cache)}
+        for store_key, products in cache.get("data", {}).items():
+            blobs[("search", store_key)] = marshal.dumps(_build_search_index(products))
+        sections = {}
+        position = 0
+        for name, blob in blobs.items():
+            sections[name] = (position, len(blob))
+            position += len(blob)
+        header = marshal.dumps({
+            "format": _SNAPSHOT_FORMAT,
+            "signature": signature,
+            "source": cache.get("source"),
+            "etag": cache.get("etag"),
+            "sections": sections,
+        })
+        with open(tmp, "wb") as f:
+            f.write(_SNAPSHOT_HEADER_LEN.pack(len(header)))
+            f.write(header)
+            for blob in blobs.values():
+                f.write(blob)
+        os.replace(tmp, snapshot)
+    except (OSError, ValueError):
+        tmp.unlink(missing_ok=True)
+
+
 def load_cache():
     """Load cached supermarket data if fresh enough."""
-    if not CACHE_FILE.exists():
+    signature = _cache_signature()
+    if signature is None:
         return None
     
     try:
-        with open(CACHE_FILE) as f:
-            cache = json.load(f)
+        cache = _read_snapshot(signature)
+        if cache is None:
+            with open(CACHE_FILE, "rb") as f:
+                cache = _loads(f.read())
+            _lowercase_names(cache.get("data", {}))
+            _write_snapshot(signature, cache)
         
         cached_at = datetime.fromisoformat(cache.get("cached_at", "2000-01-01"))
         if datetime.now() - cached_at > timedelta(hours=CACHE_MAX_AGE_HOURS):
             return None
         
-        return cache.get("data")
+        data = cache.get("data")
+        _use_snapshot_indexes(data, signature)
+        return data
     except json.JSONDecodeError as e:
         print(f"Cache file corrupted, will re-download: {e}", file=sys.stderr)
         return None
@@ -74,6 +215,49 @@ def load_cache():
         print(f"Error loading cache: {e}", file=sys.stderr)
         return None
 
+def _previous_cache(signature):
+    """The cached download if it came from the current CHECKJEBON_URL, else None.
+
+    Comes from the snapshot when it matches CACHE_FILE, so product names carry "_nl".
+    """
+    cache = _read_snapshot(signature) if signature else None
+    if cache is None:
+        try:
+            with open(CACHE_FILE, "rb") as f:
+                cache = _loads(f.read())
+        except (OSError, ValueError):
+            return None
+    if not isinstance(cache, dict) or cache.get("source") != CHECKJEBON_URL:
+        return None
+    if not isinstance(cache.get("data"), dict):
+        return None
+    return cache
+
+
+def _cached_etag(signature):
+    """ETag of the cached download if it came from the current CHECKJEBON_URL, else None."""
+    header = _snapshot_header(signature) if signature else None
+    if header is None:
+        # No usable snapshot: only the JSON itself knows the ETag
+        previous = _previous_cache(signature)
+        return previous.get("etag") if previous else None
+    return header.get("etag") if header.get("source") == CHECKJEBON_URL else None
+
+
+def _download(etag=None):
+    """GET CHECKJEBON_URL; returns (body, etag), with body None when the server answers 304."""
+    ctx = ssl.create_default_context()
+    headers = {"If-None-Match": etag} if etag else {}
+    request = urllib.request.Request(CHECKJEBON_URL, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=60, context=ctx) as response:
+            return response.read(), response.headers.get("ETag")
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and etag:
+            return None, etag
+        raise
+
+
 def update_cache():
     """Download fresh data from checkjebon."""
     print("Downloading supermarket data from checkjebon.nl...", file=sys.stderr)
@@ -81,30 +265,48 @@ def update_cache():
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
     
     try:
-        ctx = ssl.create_default_context()
-        with urllib.request.urlopen(CHECKJEBON_URL, timeout=60, context=ctx) as response:
-            raw = response.read()
-
-        actual_sha256 = hashlib.sha256(raw).hexdigest()
-        if actual_sha256 != CHECKJEBON_SHA256:
-            print(
-                f"Integrity check failed: expected {CHECKJEBON_SHA256}, got {actual_sha256}",
-                file=sys.stderr,
-            )
-            return None
+        # Revalidate with the stored ETag so an unchanged upstream file is not re-sent;
+        # the ETag comes from the snapshot header, and the cached data is only loaded on a 304
+        signature = _cache_signature()
+        raw, etag = _download(_cached_etag(signature))
+        previous = _previous_cache(signature) if raw is None else None
+        if raw is None and previous is None:
+            raw, etag = _download()  # the cached copy became unreadable after its ETag was read
+
+        if raw is None:
+            print("Supermarket data unchanged upstream, keeping cached copy.", file=sys.stderr)
+            store_data = previous["data"]
+            for products in store_data.values():
+                for product in products:
+                    product.pop("_nl", None)  # snapshot-only field, the JSON stays canonical
+        else:
+            actual_sha256 = hashlib.sha256(raw).hexdigest()
+            if actual_sha256 != CHECKJEBON_SHA256:
+                print(
+                    f"Integrity check failed: expected {CHECKJEBON_SHA256}, got {actual_sha256}",
+                    file=sys.stderr,
+                )
+                return None
 
-        data = json.loads(raw.decode())
+            data = _loads(raw)
 
-        # Convert to dict keyed by store name
-        store_data = {store["n"]: store["d"] for store in data}
+            # Convert to dict keyed by store name
+            store_data = {store["n"]: store["d"] for store in data}
         
         cache = {
             "cached_at": datetime.now().isoformat(),
+            "source": CHECKJEBON_URL,
+            "etag": etag,
             "data": store_data
         }
         
         with open(CACHE_FILE, "w") as f:
             json.dump(cache, f)
+        # The JSON stays canonical; the snapshot adds the lowercased names
+        _lowercase_names(store_data)
+        signature = _cache_signature()
+        _write_snapshot(signature, cache)
+        _use_snapshot_indexes(store_data, signature)
         
         total = sum(len(products) for products in store_data.values())
         print(f"Cached {total:,} products from {len(store_data)} stores.", file=sys.stderr)
@@ -121,67 +323,156 @@ def get_data():
         data = update_cache()
     return data
 
-def search_products(query, stores=None, limit=5):
-    """Search for products matching query."""
-    data = get_data()
-    if not data:
-        print("No data available", file=sys.stderr)
-        return []
-    
+# Per-store name-token indexes for search_products, valid for one get_data() result.
+# A store maps to None after one linear scan; its index is built if it is searched again.
+_SEARCH_INDEXES = {}
+_SEARCH_INDEX_DATA = None
+_SEARCH_INDEX_SIGNATURE = None  # snapshot to read the indexes of _SEARCH_INDEX_DATA from
+
+
+def _build_search_index(products):
+    """Map each lowercased product-name token to the positions of the products containing it.
+
+    Positions are packed as array("I") bytes, which marshal loads far faster than lists of ints.
+    """
+    token_to_products = {}
+    for idx, product in enumerate(products):
+        for token in set(_lower_name(product).split()):
+            token_to_products.setdefault(token, []).append(idx)
+    return {token: array.array("I", posting).tobytes() for token, posting in token_to_products.items()}
+
+
+def _use_snapshot_indexes(data, signature):
+    """Serve search indexes for `data` from the snapshot written for this CACHE_FILE signature."""
+    global _SEARCH_INDEX_DATA, _SEARCH_INDEX_SIGNATURE
+    _SEARCH_INDEXES.clear()
+    _SEARCH_INDEX_DATA = data
+    _SEARCH_INDEX_SIGNATURE = signature
+
+
+def _get_search_index(data, store_key):
+    """Return the token index of one store, or None when a linear scan is the cheaper option.
+
+    Data loaded through load_cache reads the index tokenized into the snapshot. Any
+    other data is scanned linearly first; a one-off query would not repay building an
+    index, so one is only built when the same data is searched a second time.
+    """
+    if data is not _SEARCH_INDEX_DATA:
+        _use_snapshot_indexes(data, None)
+    if store_key in _SEARCH_INDEXES:
+        index = _SEARCH_INDEXES[store_key]
+        if index is None:
+            index = _SEARCH_INDEXES[store_key] = _build_search_index(data[store_key])
+        return index
+    index = None
+    if _SEARCH_INDEX_SIGNATURE is not None:
+        index = _read_search_index(_SEARCH_INDEX_SIGNATURE, store_key)
+    _SEARCH_INDEXES[store_key] = index
+    return index
+
+
+def _matching_positions(index, query_words, count):
+    """Positions (in catalog order) of the products whose name contains every query word.
+
+    A query word holds no whitespace, so it is a substring of a name exactly when it
+    is a substring of one of the name's tokens: scanning the token vocabulary keeps
+    the plain `word in name` semantics ("melk" still matches "Halfvollemelk").
+    """
+    positions = None
+    for word in query_words:
+        hits = set()
+        for token, posting in index.items():
+            if word in token:
+                hits.update(memoryview(posting).cast("I"))
+        positions = hits if positions is None else positions & hits
+        if not positions:
+            return []
+    return range(count) if positions is None else sorted(positions)
+
+
+def _search_hits(data, query, stores=None):
+    """Yield (store_key, product) for every product whose name holds all query words, in catalog order."""
     # Normalize query for matching
-    query_lower = query.lower()
-    query_words = query_lower.split()
-    
-    results = []
+    query_words = query.lower().split()
     
     for store_key, products in data.items():
         if stores and store_key not in stores:
             continue
         
-        store_name = STORE_NAMES.get(store_key, store_key)
+        index = _get_search_index(data, store_key)
+        if index is None:
+            for product in products:
+                name = _lower_name(product)
+                if all(word in name for word in query_words):
+                    yield store_key, product
+            continue
         
-        for product in products:
-            name = product.get("n", "").lower()
-            
-            # Check if all query words appear in product name
-            if all(word in name for word in query_words):
-                results.append({
-                    "store": store_key,
-                    "store_name": store_name,
-                    "name": product.get("n"),
-                    "price": product.get("p"),
-                    "size": product.get("s", ""),
-                    "link": product.get("l", "")
-                })
+        # Only the products whose name holds all query words are visited
+        for idx in _matching_positions(index, query_words, len(products)):
+            yield store_key, products[idx]
+
+
+def _search_result(store_key, product):
+    """The result dict search and compare report for one product."""
+    return {
+        "store": store_key,
+        "store_name": STORE_NAMES.get(store_key, store_key),
+        "name": product.get("n"),
+        "price": product.get("p"),
+        "size": product.get("s", ""),
+        "link": product.get("l", "")
+    }
+
+
+_PRICE = itemgetter("price")
+
+
+def _cheapest(results, limit):
+    """`results` sorted by price and cut to `limit`; equal prices keep their order."""
+    if limit and limit > 0:
+        # Only the top `limit` are kept while scanning: O(n log limit), not a full sort
+        return heapq.nsmallest(limit, results, key=_PRICE)
+    results = sorted(results, key=_PRICE)
+    return results[:limit] if limit else results
+
+
+def search_products(query, stores=None, limit=5):
+    """Search for products matching query."""
+    data = get_data()
+    if not data:
+        print("No data available", file=sys.stderr)
+        return []
     
-    # Sort by price
-    results.sort(key=lambda x: x.get("price", 999))
+    results = (_search_result(store_key, product) for store_key, product in _search_hits(data, query, stores))
     
-    return results[:limit] if limit else results
+    # Cheapest first
+    return _cheapest(results, limit)
 
 def compare_prices(query, stores=None, limit=None, as_json=False):
     """Compare prices across stores for a product."""
-    results = search_products(query, stores, limit=None)
+    # Single pass keeping the cheapest match per store; on equal prices the first
+    # in catalog order wins, as it did when grouping the price-sorted search results
+    cheapest = {}
+    data = get_data()
+    if data:
+        for store_key, product in _search_hits(data, query, stores):
+            best = cheapest.get(store_key)
+            if best is None or product.get("p") < best.get("p"):
+                cheapest[store_key] = product
+    else:
+        print("No data available", file=sys.stderr)
     
-    if not results:
+    if not cheapest:
         if as_json:
             print(json.dumps({"error": f"No products found for: {query}"}, ensure_ascii=False))
         else:
             print(f"No products found for: {query}")
         return []
     
-    # Group by store, show cheapest per store
-    by_store = {}
-    for r in results:
-        store = r["store"]
-        if store not in by_store or r["price"] < by_store[store]["price"]:
-            by_store[store] = r
-    
     # Sort stores by price
-    sorted_stores = sorted(by_store.values(), key=lambda x: x["price"])
-    
-    if limit:
-        sorted_stores = sorted_stores[:limit]
+    sorted_stores = _cheapest(
+        (_search_result(store_key, product) for store_key, product in cheapest.items()), limit
+    )
     
     if as_json:
         print(json.dumps(sorted_stores, indent=2, ensure_ascii=False))
@@ -198,6 +489,31 @@ def compare_prices(query, stores=None, limit=None, as_json=False):
     return sorted_stores
 
 
+# Common products and their "normal" price thresholds
+DEAL_KEYWORDS = {
+    "melk": 1.20,
+    "brood": 1.50,
+    "kaas": 3.00,
+    "boter": 2.00,
+    "eieren": 2.50,
+    "kip": 4.00,
+    "gehakt": 4.00,
+    "pasta": 1.00,
+    "rijst": 1.50,
+    "bier": 0.80,
+    "cola": 1.00,
+    "chips": 1.50,
+    "pizza": 2.50,
+    "yoghurt": 1.00,
+    "appels": 1.50,
+    "bananen": 1.50,
+}
+
+# A deal is priced 25% below normal; keyword order decides the category on overlap
+_DEAL_PRICES = tuple((keyword, threshold * 0.75) for keyword, threshold in DEAL_KEYWORDS.items())
+_DEAL_RE = re.compile("|".join(map(re.escape, DEAL_KEYWORDS)))
+
+
 def find_deals(stores=None, limit=20, as_json=False):
     """Find products that appear to be on sale (low prices, common items)."""
     data = get_data()
@@ -210,26 +526,6 @@ def find_deals(stores=None, limit=20, as_json=False):
     # Since checkjebon doesn't have explicit deal markers, we find suspiciously cheap items
     deals = []
     
-    # Common products and their "normal" price thresholds
-    deal_keywords = {
-        "melk": 1.20,
-        "brood": 1.50,
-        "kaas": 3.00,
-        "boter": 2.00,
-        "eieren": 2.50,
-        "kip": 4.00,
-        "gehakt": 4.00,
-        "pasta": 1.00,
-        "rijst": 1.50,
-        "bier": 0.80,
-        "cola": 1.00,
-        "chips": 1.50,
-        "pizza": 2.50,
-        "yoghurt": 1.00,
-        "appels": 1.50,
-        "bananen": 1.50,
-    }
-    
     for store_key, products in data.items():
         if stores and store_key not in stores:
             continue
@@ -237,12 +533,16 @@ def find_deals(stores=None, limit=20, as_json=False):
         store_name = STORE_NAMES.get(store_key, store_key)
         
         for product in products:
-            name = product.get("n", "").lower()
+            name = _lower_name(product)
+            
+            # One scan rules out the many names that hold no keyword at all
+            if not _DEAL_RE.search(name):
+                continue
             price = product.get("p", 999)
             
             # Check if product matches a deal keyword and is below threshold
-            for keyword, threshold in deal_keywords.items():
-                if keyword in name and price < threshold * 0.75:  # 25% below normal
+            for keyword, max_price in _DEAL_PRICES:
+                if keyword in name and price < max_price:
                     deals.append({
                         "store": store_key,
                         "store_name": store_name,
@@ -254,11 +554,8 @@ def find_deals(stores=None, limit=20, as_json=False):
                     })
                     break
     
-    # Sort by price, dedupe similar items
-    deals.sort(key=lambda x: x["price"])
-    
-    # Limit results
-    deals = deals[:limit] if limit else deals
+    # Sort by price and limit results
+    deals = _cheapest(deals, limit)
     
     if as_json:
         print(json.dumps(deals, indent=2, ensure_ascii=False))
@@ -1,7 +1,14 @@
 """Shared fixtures for grocery intelligence tests."""
 
+import sys
+from pathlib import Path
+
 import pytest
 
+# The scripts are standalone CLIs, not a package; make them importable once
+# for every test module.
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
 
 @pytest.fixture
 def sample_store_products():
@@ -37,9 +44,9 @@ def sample_store_data():
     }
 
 
-@pytest.fixture
-def sample_receipts_jsonl(tmp_path):
-    """Create a temporary receipts JSONL file with sample data."""
+@pytest.fixture(scope="session")
+def sample_receipts_text():
+    """Serialized sample receipts, built once per session."""
     import json
 
     receipts = [
@@ -48,10 +55,14 @@ def sample_receipts_jsonl(tmp_path):
         {"store": "Lidl", "amount": 32.10, "category": "boodschappen", "date": "2026-02-03"},
         {"store": "Praxis", "amount": "€15.00", "category": "klussen", "date": "2026-02-04"},
     ]
+    return "".join(json.dumps(r) + "\n" for r in receipts)
 
-    jsonl_file = tmp_path / "receipts.jsonl"
-    with open(jsonl_file, "w") as f:
-        for r in receipts:
-            f.write(json.dumps(r) + "\n")
 
+@pytest.fixture
+def sample_receipts_jsonl(tmp_path, sample_receipts_text):
+    """Create a temporary receipts JSONL file with sample data."""
+    # Per test, not per session: tests append to the log and leave snapshot
+    # sidecars next to it.
+    jsonl_file = tmp_path / "receipts.jsonl"
+    jsonl_file.write_text(sample_receipts_text)
     return jsonl_file
@@ -1,11 +1,22 @@
 """Tests for grocery_feedback.py - product matching and confidence scoring."""
 
-import sys
-from pathlib import Path
+import io
+import json
+import os
+from datetime import datetime
+from unittest.mock import patch
 
-sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
-
-from grocery_feedback import find_best_product_match, calculate_match_confidence
+from grocery_feedback import (
+    MIN_MATCH_SCORE,
+    calculate_match_confidence,
+    compact_feedback,
+    count_pending_feedback,
+    find_best_product_match,
+    find_receipt_discrepancies,
+    mark_entries_submitted,
+    run_daemon,
+    verify_receipt_against_checkjebon,
+)
 
 
 class TestFindBestProductMatch:
@@ -54,6 +65,13 @@ class TestFindBestProductMatch:
         assert result is not None
         assert result["price"] == 5.99
 
+    def test_score_equal_to_threshold_is_rejected(self):
+        """3 common words out of a 10-word receipt name score exactly MIN_MATCH_SCORE."""
+        assert 3 / 10 == MIN_MATCH_SCORE
+        products = [{"n": "a b c", "p": 1.00, "s": ""}]
+        assert find_best_product_match("a b c d e f g h i j", products) is None
+        assert find_best_product_match("a b c d e f g h i", products) is not None
+
     def test_best_match_selected(self):
         """When multiple products match, the best scoring one is returned."""
         products = [
@@ -64,6 +82,21 @@ class TestFindBestProductMatch:
         assert result is not None
         assert result["price"] == 1.89
 
+    def test_results_follow_the_catalog_passed(self, sample_store_products):
+        assert find_best_product_match("Kipfilet", sample_store_products)["price"] == 7.49
+        # An entry replaced in place, at the same list length, is matched by its new name
+        sample_store_products[3] = {"n": "Appelsap", "p": 2.0, "s": "1L"}
+        assert find_best_product_match("Appelsap", sample_store_products)["price"] == 2.0
+        assert find_best_product_match("Kipfilet", sample_store_products) is None
+
+    def test_prebuilt_index_is_used(self, sample_store_products):
+        import grocery_feedback
+
+        store_index = grocery_feedback._build_store_index(sample_store_products)
+        with patch("grocery_feedback._build_store_index", side_effect=AssertionError("re-indexed")):
+            result = find_best_product_match("Kipfilet", sample_store_products, store_index)
+        assert result["price"] == 7.49
+
 
 class TestCalculateMatchConfidence:
     """Tests for calculate_match_confidence()."""
@@ -96,3 +129,164 @@ class TestCalculateMatchConfidence:
         score1 = calculate_match_confidence("MELK HALFVOL", "melk halfvol")
         score2 = calculate_match_confidence("melk halfvol", "melk halfvol")
         assert score1 == score2
+
+
+class TestVerifyReceiptAgainstCheckjebon:
+    """Tests for verify_receipt_against_checkjebon() and its cached checkjebon load."""
+
+    def _write_cache(self, path, products):
+        path.write_text(json.dumps({"cached_at": "2026-02-20T00:00:00", "data": {"ah": products}}))
+
+    def test_reports_discrepancy(self, tmp_path, sample_store_products):
+        cache_file = tmp_path / "supermarkets-cache.json"
+        self._write_cache(cache_file, sample_store_products)
+        receipt = [{"name": "Kipfilet", "price": 8.49, "date": "2026-02-20"}]
+        with patch("grocery_feedback._CHECKJEBON_FILE", cache_file):
+            result = verify_receipt_against_checkjebon(receipt, "AH")
+        assert len(result) == 1
+        assert result[0]["checkjebon_price"] == 7.49
+        assert result[0]["price_difference"] == 8.49 - 7.49
+
+    def test_reloads_when_cache_file_changes(self, tmp_path):
+        cache_file = tmp_path / "supermarkets-cache.json"
+        receipt = [{"name": "Kipfilet", "price": 8.49, "date": "2026-02-20"}]
+        with patch("grocery_feedback._CHECKJEBON_FILE", cache_file):
+            self._write_cache(cache_file, [{"n": "Kipfilet", "p": 7.49, "s": ""}])
+            assert verify_receipt_against_checkjebon(receipt, "ah")[0]["checkjebon_price"] == 7.49
+
+            self._write_cache(cache_file, [{"n": "Kipfilet", "p": 6.99, "s": ""}])
+            os.utime(cache_file, ns=(0, 1))  # force a new signature within mtime resolution
+            assert verify_receipt_against_checkjebon(receipt, "ah")[0]["checkjebon_price"] == 6.99
+
+    def test_index_sidecar_skips_json_parse(self, tmp_path, sample_store_products):
+        cache_file = tmp_path / "supermarkets-cache.json"
+        self._write_cache(cache_file, sample_store_products)
+        receipt = [{"name": "Kipfilet", "price": 8.49, "date": "2026-02-20"}]
+        with patch("grocery_feedback._CHECKJEBON_FILE", cache_file):
+            first = verify_receipt_against_checkjebon(receipt, "ah")
+            assert (tmp_path / "supermarkets-cache.idx").exists()
+
+            # A fresh process: nothing in memory, and the JSON must not be parsed again
+            with patch("grocery_feedback._STORE_INDEX_VERSION", None), \
+                    patch("grocery_feedback.json.load", side_effect=AssertionError("JSON re-parsed")):
+                assert verify_receipt_against_checkjebon(receipt, "ah") == first
+
+    def test_missing_cache(self, tmp_path):
+        with patch("grocery_feedback._CHECKJEBON_FILE", tmp_path / "missing.json"):
+            assert verify_receipt_against_checkjebon([{"name": "Melk", "price": 1.0}], "ah") == []
+
+
+class TestReceiptAnalysisCache:
+    """Tests for the receipt content-hash cache in find_receipt_discrepancies()."""
+
+    def test_unchanged_receipt_skips_verification(self, tmp_path, sample_store_products):
+        cache_file = tmp_path / "supermarkets-cache.json"
+        cache_file.write_text(json.dumps({"cached_at": "2026-02-20T00:00:00", "data": {"ah": sample_store_products}}))
+        receipt_file = tmp_path / "receipt.json"
+        receipt_file.write_text(json.dumps([{"name": "Kipfilet", "price": 8.49, "date": "2026-02-20"}]))
+        with patch("grocery_feedback._CHECKJEBON_FILE", cache_file), \
+                patch("grocery_feedback._ALLOWED_RECEIPT_DIR", tmp_path), \
+                patch("grocery_feedback.LOCAL_FEEDBACK_FILE", tmp_path / "grocery-feedback.jsonl"):
+            first = find_receipt_discrepancies(str(receipt_file), "ah")
+            assert len(first) == 1
+            with patch("grocery_feedback._price_discrepancies",
+                       side_effect=AssertionError("re-verified")):
+                assert find_receipt_discrepancies(str(receipt_file), "ah") == first
+
+            # A different store is a different analysis
+            assert find_receipt_discrepancies(str(receipt_file), "jumbo") == []
+
+    def test_undated_items_are_dated_on_each_hit(self, tmp_path, sample_store_products):
+        cache_file = tmp_path / "supermarkets-cache.json"
+        cache_file.write_text(json.dumps({"cached_at": "2026-02-20T00:00:00", "data": {"ah": sample_store_products}}))
+        receipt_file = tmp_path / "receipt.json"
+        receipt_file.write_text(json.dumps([{"name": "Kipfilet", "price": 8.49}]))
+        with patch("grocery_feedback._CHECKJEBON_FILE", cache_file), \
+                patch("grocery_feedback._ALLOWED_RECEIPT_DIR", tmp_path), \
+                patch("grocery_feedback.LOCAL_FEEDBACK_FILE", tmp_path / "grocery-feedback.jsonl"), \
+                patch("grocery_feedback.datetime") as mock_datetime:
+            mock_datetime.now.return_value = datetime(2026, 2, 20, 9, 0)
+            assert find_receipt_discrepancies(str(receipt_file), "ah")[0]["date"] == "2026-02-20T09:00:00"
+            mock_datetime.now.return_value = datetime(2026, 2, 21, 9, 0)
+            assert find_receipt_discrepancies(str(receipt_file), "ah")[0]["date"] == "2026-02-21T09:00:00"
+
+    def test_oldest_entries_are_dropped(self, tmp_path, sample_store_products):
+        cache_file = tmp_path / "supermarkets-cache.json"
+        cache_file.write_text(json.dumps({"cached_at": "2026-02-20T00:00:00", "data": {"ah": sample_store_products}}))
+        analysis_file = tmp_path / "receipt-analysis-cache.jsonl"
+
+        def analyze(price):
+            receipt_file = tmp_path / f"receipt-{price}.json"
+            receipt_file.write_text(json.dumps([{"name": "Kipfilet", "price": price, "date": "2026-02-20"}]))
+            find_receipt_discrepancies(str(receipt_file), "ah")
+
+        with patch("grocery_feedback._CHECKJEBON_FILE", cache_file), \
+                patch("grocery_feedback._ALLOWED_RECEIPT_DIR", tmp_path), \
+                patch("grocery_feedback.LOCAL_FEEDBACK_FILE", tmp_path / "grocery-feedback.jsonl"):
+            analyze(8.49)
+            # Cap at just over one entry; the entries all have the same length
+            with patch("grocery_feedback.MAX_ANALYSIS_BYTES", analysis_file.stat().st_size + 1):
+                for price in (8.59, 8.69, 8.79):
+                    analyze(price)
+        # Trimmed once the file reached twice the cap, back to the newest entries within it
+        entries = [json.loads(line) for line in analysis_file.open()]
+        assert [e["discrepancies"][0]["receipt_price"] for e in entries] == [8.69, 8.79]
+
+
+class TestFeedbackStatus:
+    """Tests for submitted-status tombstones and compaction."""
+
+    def _write_feedback(self, path, timestamps):
+        with open(path, "w") as f:
+            for ts in timestamps:
+                f.write(json.dumps({"timestamp": ts, "status": "pending_submission", "discrepancies": []}) + "\n")
+
+    def test_mark_submitted_reduces_pending(self, tmp_path):
+        feedback_file = tmp_path / "grocery-feedback.jsonl"
+        self._write_feedback(feedback_file, ["t1", "t2", "t3"])
+        with patch("grocery_feedback.LOCAL_FEEDBACK_FILE", feedback_file):
+            mark_entries_submitted(["t1", "t3"])
+            assert count_pending_feedback() == 1
+        # The feedback JSONL itself is not rewritten when marking
+        assert all(json.loads(line)["status"] == "pending_submission" for line in feedback_file.open())
+
+    def test_compact_folds_tombstones(self, tmp_path):
+        feedback_file = tmp_path / "grocery-feedback.jsonl"
+        self._write_feedback(feedback_file, ["t1", "t2"])
+        with patch("grocery_feedback.LOCAL_FEEDBACK_FILE", feedback_file):
+            mark_entries_submitted(["t2"])
+            compact_feedback()
+            assert count_pending_feedback() == 1
+        statuses = {json.loads(line)["timestamp"]: json.loads(line)["status"] for line in feedback_file.open()}
+        assert statuses == {"t1": "pending_submission", "t2": "submitted"}
+        assert (tmp_path / "grocery-feedback-status.jsonl").read_text() == ""
+
+
+class TestDaemon:
+    """Tests for the JSON-line --daemon mode."""
+
+    def test_replies_one_line_per_command(self, tmp_path):
+        commands = "\n".join([
+            json.dumps({"cmd": "stats"}),
+            "not json",
+            json.dumps({"cmd": "verify", "receipt": 1}),
+            json.dumps({"cmd": "nope"}),
+        ]) + "\n"
+        out = io.StringIO()
+        with patch("grocery_feedback.LOCAL_FEEDBACK_FILE", tmp_path / "grocery-feedback.jsonl"):
+            run_daemon(io.StringIO(commands), out)
+        replies = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert replies[0] == {"ok": True, "pending": 0}
+        assert [r["ok"] for r in replies] == [True, False, False, False]
+
+    def test_failing_command_does_not_end_the_session(self, tmp_path):
+        commands = "\n".join([
+            json.dumps({"cmd": "verify", "receipt": "r.jpg", "store": "ah"}),
+            json.dumps({"cmd": "stats"}),
+        ]) + "\n"
+        out = io.StringIO()
+        with patch("grocery_feedback.LOCAL_FEEDBACK_FILE", tmp_path / "grocery-feedback.jsonl"), \
+                patch("grocery_feedback.find_receipt_discrepancies", side_effect=OSError("disk full")):
+            run_daemon(io.StringIO(commands), out)
+        replies = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert replies == [{"ok": False, "error": "disk full"}, {"ok": True, "pending": 0}]
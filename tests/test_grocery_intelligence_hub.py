@@ -1,51 +1,81 @@
-"""Tests for grocery_intelligence_hub.py - store detection."""
+"""Tests for grocery_intelligence_hub.py - store detection and batch store assignment."""
 
-import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from unittest.mock import patch
 
-sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+import pytest
 
 from grocery_intelligence_hub import GroceryIntelligenceHub
 
 
-class TestDetectStoreFromFilename:
-    """Tests for detect_store_from_filename()."""
-
-    def setup_method(self):
-        self.hub = GroceryIntelligenceHub()
-
-    def test_lidl(self):
-        assert self.hub.detect_store_from_filename("receipt-lidl-20260220.jpg") == "lidl"
-
-    def test_ah_keyword(self):
-        assert self.hub.detect_store_from_filename("ah-bon-123.png") == "ah"
-
-    def test_albert_keyword(self):
-        assert self.hub.detect_store_from_filename("albert-heijn-receipt.jpg") == "ah"
-
-    def test_heijn_keyword(self):
-        assert self.hub.detect_store_from_filename("heijn_receipt.jpg") == "ah"
+@pytest.fixture(scope="class")
+def hub():
+    """One hub per test class; store detection keeps no per-call state."""
+    return GroceryIntelligenceHub()
 
-    def test_jumbo(self):
-        assert self.hub.detect_store_from_filename("jumbo_20260220.jpg") == "jumbo"
 
-    def test_dirk(self):
-        assert self.hub.detect_store_from_filename("dirk-receipt.jpg") == "dirk"
-
-    def test_hoogvliet(self):
-        assert self.hub.detect_store_from_filename("hoogvliet_bon.png") == "hoogvliet"
-
-    def test_aldi(self):
-        assert self.hub.detect_store_from_filename("aldi-20260220.jpg") == "aldi"
-
-    def test_plus(self):
-        assert self.hub.detect_store_from_filename("plus-receipt.jpg") == "plus"
-
-    def test_case_insensitive(self):
-        assert self.hub.detect_store_from_filename("LIDL_RECEIPT.JPG") == "lidl"
-
-    def test_no_match(self):
-        assert self.hub.detect_store_from_filename("random-photo.jpg") is None
+class TestDetectStoreFromFilename:
+    """Tests for detect_store_from_filename()."""
 
-    def test_no_match_generic(self):
-        assert self.hub.detect_store_from_filename("IMG_20260220_123456.jpg") is None
+    @pytest.mark.parametrize("filename, expected", [
+        ("receipt-lidl-20260220.jpg", "lidl"),
+        ("ah-bon-123.png", "ah"),
+        ("albert-heijn-receipt.jpg", "ah"),
+        ("heijn_receipt.jpg", "ah"),
+        ("jumbo_20260220.jpg", "jumbo"),
+        ("dirk-receipt.jpg", "dirk"),
+        ("hoogvliet_bon.png", "hoogvliet"),
+        ("aldi-20260220.jpg", "aldi"),
+        ("plus-receipt.jpg", "plus"),
+        ("LIDL_RECEIPT.JPG", "lidl"),  # case insensitive
+        ("random-photo.jpg", None),
+        ("IMG_20260220_123456.jpg", None),
+        ("plus-lidl.jpg", "lidl"),  # priority when several keywords match
+        ("jumbo-ah.jpg", "ah"),
+        ("aldirk.jpg", "dirk"),  # overlapping keywords
+    ])
+    def test_detect(self, hub, filename, expected):
+        assert hub.detect_store_from_filename(filename) == expected
+
+
+class TestCollectStoreAssignments:
+    """Tests for _collect_store_assignments()."""
+
+    def test_prompts_only_for_unknown_and_drops_skipped(self):
+        hub = GroceryIntelligenceHub()
+        files = [Path("a/lidl-1.jpg"), Path("a/IMG_1.jpg"), Path("a/IMG_2.jpg"), Path("a/ah-2.png")]
+        with patch("builtins.input", side_effect=["Jumbo", "skip"]) as mock_input:
+            jobs = hub._collect_store_assignments(files)
+        assert mock_input.call_count == 2
+        assert jobs == [
+            (str(files[0]), "lidl"),
+            (str(files[1]), "jumbo"),
+            (str(files[3]), "ah"),
+        ]
+
+
+class TestBatchProcessReceipts:
+    """Tests for batch_process_receipts()."""
+
+    def test_one_feedback_entry_per_receipt_despite_failures(self, tmp_path):
+        for name in ("lidl-1.jpg", "ah-2.jpg", "jumbo-3.jpg"):
+            (tmp_path / name).write_bytes(b"")
+        found = {"lidl-1.jpg": [{"product": "Melk"}], "ah-2.jpg": OSError("unreadable"), "jumbo-3.jpg": [{"product": "Kaas"}]}
+
+        def process(receipt_path, store_name):
+            result = found[Path(receipt_path).name]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        hub = GroceryIntelligenceHub()
+        with patch("concurrent.futures.ProcessPoolExecutor", ThreadPoolExecutor), \
+                patch("grocery_intelligence_hub._process_one", side_effect=process), \
+                patch("grocery_intelligence_hub.report_discrepancies"), \
+                patch("grocery_intelligence_hub.submit_feedback_locally") as submit, \
+                patch.object(hub, "feedback_stats"), \
+                patch("builtins.input", return_value="n"):
+            hub.batch_process_receipts(tmp_path)
+        logged = sorted(tuple(d["product"] for d in call.args[0]) for call in submit.call_args_list)
+        assert logged == [("Kaas",), ("Melk",)]
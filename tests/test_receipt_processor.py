@@ -1,13 +1,26 @@
-"""Tests for receipt_processor.py - stats and list commands."""
+"""Tests for receipt_processor.py - stats and list commands, display sanitizing."""
 
 import json
-import sys
+import math
+import os
+import time
 from pathlib import Path
 from unittest.mock import patch
 
-sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+import pytest
 
-from receipt_processor import cmd_stats, cmd_list, RECEIPTS_JSONL
+from receipt_processor import (
+    cmd_stats,
+    cmd_list,
+    cmd_batch,
+    save_receipt,
+    detect_grocery_only_mode,
+    analyze_with_ollama,
+    RECEIPTS_JSONL,
+    _parse_line,
+    _sanitize_for_display,
+    _validate_llm_response,
+)
 
 
 class TestCmdStats:
@@ -34,6 +47,17 @@ class TestCmdStats:
         assert output["total_amount"] == 90.90
         assert output["total_receipts"] == 4
 
+    def test_indented_only_on_a_terminal(self, sample_receipts_jsonl, capsys):
+        with patch("receipt_processor.RECEIPTS_JSONL", sample_receipts_jsonl):
+            cmd_stats([])
+            piped = capsys.readouterr().out
+            with patch("sys.stdout.isatty", return_value=True):
+                cmd_stats([])
+            tty = capsys.readouterr().out
+        assert piped.count("\n") == 1
+        assert tty.startswith("{\n  ")
+        assert json.loads(piped) == json.loads(tty)
+
     def test_euro_string_parsing(self, tmp_path, capsys):
         """Amounts with euro sign string format should be parsed correctly."""
         jsonl_file = tmp_path / "receipts.jsonl"
@@ -45,6 +69,18 @@ class TestCmdStats:
         output = json.loads(capsys.readouterr().out)
         assert output["total_amount"] == 12.50
 
+    def test_non_object_lines_are_skipped(self, tmp_path, capsys):
+        jsonl_file = tmp_path / "receipts.jsonl"
+        with open(jsonl_file, "w") as f:
+            f.write("[1, 2]\n5\n")
+            f.write(json.dumps({"store": "AH", "amount": 12.5, "category": "food"}) + "\n")
+
+        with patch("receipt_processor.RECEIPTS_JSONL", jsonl_file):
+            cmd_stats([])
+        output = json.loads(capsys.readouterr().out)
+        assert output["total_receipts"] == 1
+        assert output["total_amount"] == 12.5
+
     def test_empty_file(self, tmp_path, capsys):
         jsonl_file = tmp_path / "receipts.jsonl"
         jsonl_file.touch()
@@ -55,6 +91,33 @@ class TestCmdStats:
         assert output["total_amount"] == 0
 
 
+class TestStatsCache:
+    """Tests for the append-only aggregate snapshot behind cmd_stats()/cmd_list()."""
+
+    def test_only_appended_lines_are_parsed(self, sample_receipts_jsonl, capsys):
+        with patch("receipt_processor.RECEIPTS_JSONL", sample_receipts_jsonl):
+            cmd_stats([])
+            capsys.readouterr()
+            with open(sample_receipts_jsonl, "a") as f:
+                f.write(json.dumps({"store": "Lidl", "amount": 1.0, "category": "boodschappen"}) + "\n")
+            with patch("receipt_processor._parse_line", wraps=_parse_line) as loads:
+                cmd_stats([])
+        assert loads.call_count == 1
+        output = json.loads(capsys.readouterr().out)
+        assert output["total_receipts"] == 5
+        assert output["by_store"]["Lidl"] == 33.10
+
+    def test_rewritten_log_invalidates_snapshot(self, sample_receipts_jsonl, capsys):
+        with patch("receipt_processor.RECEIPTS_JSONL", sample_receipts_jsonl):
+            cmd_stats([])
+            capsys.readouterr()
+            sample_receipts_jsonl.write_text(json.dumps({"store": "Jumbo", "amount": 2.5}) + "\n")
+            cmd_stats([])
+        output = json.loads(capsys.readouterr().out)
+        assert output["total_receipts"] == 1
+        assert output["by_store"] == {"Jumbo": 2.5}
+
+
 class TestCmdList:
     """Tests for cmd_list()."""
 
@@ -80,6 +143,57 @@ class TestCmdList:
         # Last entry in file was Praxis, so it should be first in output
         assert output["receipts"][0]["store"] == "Praxis"
 
+    def test_tail_window_grows_past_malformed_lines(self, tmp_path, capsys):
+        jsonl_file = tmp_path / "receipts.jsonl"
+        with open(jsonl_file, "w") as f:
+            for i in range(50):
+                f.write(json.dumps({"store": f"S{i}", "amount": i}) + "\n")
+            f.write("{not json\n\n")
+        with patch("receipt_processor.RECEIPTS_JSONL", jsonl_file), \
+                patch("receipt_processor._TAIL_WINDOW", 16):
+            cmd_list(["5"])
+        output = json.loads(capsys.readouterr().out)
+        assert [r["store"] for r in output["receipts"]] == ["S49", "S48", "S47", "S46", "S45"]
+
+    def test_saved_receipts_are_listed_through_the_index(self, tmp_path, capsys):
+        image = tmp_path / "bon.jpg"
+        image.write_bytes(b"\xff\xd8")
+        receipts_dir = tmp_path / "receipts"
+        receipts_dir.mkdir()
+        jsonl_file = tmp_path / "receipts.jsonl"
+        with patch("receipt_processor.RECEIPTS_JSONL", jsonl_file), \
+                patch("receipt_processor.RECEIPTS_DIR", receipts_dir):
+            for store in ("AH", "Lidl", "Jumbo"):
+                save_receipt({"store": store, "amount": 1.0}, str(image))
+            with patch("receipt_processor._tail_records", side_effect=AssertionError("tail read")):
+                cmd_list(["2"])
+        assert (tmp_path / "receipts.idx").stat().st_size == 3 * 8
+        assert len(list(receipts_dir.iterdir())) == 3  # same-second saves get distinct files
+        output = json.loads(capsys.readouterr().out)
+        assert [r["store"] for r in output["receipts"]] == ["Jumbo", "Lidl"]
+        assert output["total"] == 3
+
+    def test_index_is_built_for_existing_log(self, sample_receipts_jsonl, capsys):
+        with patch("receipt_processor.RECEIPTS_JSONL", sample_receipts_jsonl):
+            cmd_list([])
+            first = capsys.readouterr().out
+            with patch("receipt_processor._tail_records", side_effect=AssertionError("tail read")):
+                cmd_list([])
+        assert capsys.readouterr().out == first
+
+    def test_non_object_lines_are_skipped(self, tmp_path, capsys):
+        jsonl_file = tmp_path / "receipts.jsonl"
+        with open(jsonl_file, "w") as f:
+            f.write(json.dumps({"store": "AH", "amount": 1.0}) + "\n")
+            f.write("[1, 2]\n5\n")
+        with patch("receipt_processor.RECEIPTS_JSONL", jsonl_file):
+            cmd_list([])  # tail read, which also builds the index
+            cmd_list([])  # indexed read
+        for out in capsys.readouterr().out.strip().split("\n"):
+            output = json.loads(out)
+            assert output["receipts"] == [{"store": "AH", "amount": 1.0}]
+            assert output["total"] == 1
+
     def test_no_file(self, tmp_path, capsys):
         missing_file = tmp_path / "nonexistent.jsonl"
         with patch("receipt_processor.RECEIPTS_JSONL", missing_file):
@@ -87,3 +201,163 @@ class TestCmdList:
         output = json.loads(capsys.readouterr().out)
         assert output["receipts"] == []
         assert output["total"] == 0
+
+
+class TestVisionCache:
+    """Tests for the content-hash cache in analyze_with_ollama()."""
+
+    REPLY = json.dumps({"response": '{"is_receipt": true, "store": "AH", "amount": 3.5}'}).encode()
+
+    def _analyze(self, tmp_path, image, reply=REPLY, **kwargs):
+        with patch("receipt_processor.RECEIPTS_DIR", tmp_path / "receipts"), \
+                patch("receipt_processor._ollama_post", return_value=reply) as post:
+            result = analyze_with_ollama(str(image), **kwargs)
+        return result, post.call_count
+
+    def test_repeat_image_skips_inference(self, tmp_path):
+        image = tmp_path / "bon.jpg"
+        image.write_bytes(b"\xff\xd8receipt")
+        first, calls = self._analyze(tmp_path, image)
+        assert calls == 1
+        second, calls = self._analyze(tmp_path, image)
+        assert calls == 0
+        assert second == first == {"is_receipt": True, "store": "AH", "amount": 3.5}
+        _, calls = self._analyze(tmp_path, image, use_cache=False)
+        assert calls == 1
+
+    def test_other_model_or_bytes_miss(self, tmp_path):
+        image = tmp_path / "bon.jpg"
+        image.write_bytes(b"\xff\xd8receipt")
+        self._analyze(tmp_path, image)
+        with patch("receipt_processor.VISION_MODEL", "other-model"):
+            assert self._analyze(tmp_path, image)[1] == 1
+        image.write_bytes(b"\xff\xd8another receipt")
+        assert self._analyze(tmp_path, image)[1] == 1
+
+    def test_errors_are_not_cached(self, tmp_path):
+        image = tmp_path / "bon.jpg"
+        image.write_bytes(b"\xff\xd8receipt")
+        result, _ = self._analyze(tmp_path, image, reply=b"not json")
+        assert result == {"error": "Analysis service unavailable"}
+        assert self._analyze(tmp_path, image)[1] == 1
+
+
+class TestCmdBatch:
+    """Tests for cmd_batch()."""
+
+    def test_analyzes_inbound_images_oldest_first(self, tmp_path, capsys):
+        for age, name in ((30, "new.jpg"), (90, "old.PNG"), (60, "mid.webp"), (10, "note.txt")):
+            image = tmp_path / name
+            image.write_bytes(b"x")
+            mtime = 1_700_000_000 - age
+            os.utime(image, (mtime, mtime))
+
+        def fake_analyze(path, use_cache=True):
+            if path.endswith("mid.webp"):
+                raise ValueError("Image too large")
+            return {"is_receipt": True}
+
+        with patch("receipt_processor.INBOUND_DIR", tmp_path), \
+                patch("receipt_processor.analyze_with_ollama", side_effect=fake_analyze):
+            cmd_batch([])
+        output = json.loads(capsys.readouterr().out)
+        assert [Path(r["image_path"]).name for r in output["results"]] == ["old.PNG", "mid.webp", "new.jpg"]
+        assert output["results"][1] == {"error": "Image too large", "image_path": str(tmp_path.resolve() / "mid.webp")}
+        assert output["total"] == 3
+
+
+class TestDetectGroceryOnlyMode:
+    """Tests for detect_grocery_only_mode()."""
+
+    def _message(self, folder, name, text, age=0):
+        msg = folder / name
+        msg.write_text(json.dumps({"text": text}))
+        mtime = time.time() - age
+        os.utime(msg, (mtime, mtime))
+        return msg
+
+    def test_recent_message_with_keyword(self, tmp_path):
+        self._message(tmp_path, "a.json", "Hallo")
+        self._message(tmp_path, "b.json", "Just a PRICE SCAN please")
+        with patch("receipt_processor.INBOUND_DIR", tmp_path):
+            assert detect_grocery_only_mode() is True
+
+    def test_ignores_old_messages_and_symlinks(self, tmp_path):
+        inbound = tmp_path / "inbound"
+        inbound.mkdir()
+        self._message(inbound, "old.json", "grocery only", age=600)
+        (inbound / "link.json").symlink_to(self._message(tmp_path, "outside.json", "grocery only"))
+        with patch("receipt_processor.INBOUND_DIR", inbound):
+            assert detect_grocery_only_mode() is False
+
+
+class TestSaveReceipt:
+    """Tests for save_receipt()."""
+
+    def _save(self, tmp_path):
+        image = tmp_path / "bon.jpg"
+        image.write_bytes(b"\xff\xd8jpeg")
+        receipts_dir = tmp_path / "receipts"
+        receipts_dir.mkdir()
+        with patch("receipt_processor.RECEIPTS_JSONL", tmp_path / "receipts.jsonl"), \
+                patch("receipt_processor.RECEIPTS_DIR", receipts_dir):
+            result = save_receipt({"store": "AH", "amount": 1.0}, str(image))
+        return image, Path(result["image_file"])
+
+    def test_image_is_hard_linked(self, tmp_path):
+        image, saved = self._save(tmp_path)
+        assert saved.stat().st_ino == image.stat().st_ino
+
+    def test_falls_back_to_copy_across_filesystems(self, tmp_path):
+        with patch("receipt_processor.os.link", side_effect=OSError("EXDEV")):
+            image, saved = self._save(tmp_path)
+        assert saved.stat().st_ino != image.stat().st_ino
+        assert saved.read_bytes() == b"\xff\xd8jpeg"
+
+
+class TestValidateLlmResponse:
+    """Tests for _validate_llm_response()."""
+
+    def test_keeps_iso_date(self):
+        assert _validate_llm_response({"is_receipt": True, "date": "2026-02-20"})["date"] == "2026-02-20"
+
+    def test_drops_date_with_trailing_newline(self):
+        assert "date" not in _validate_llm_response({"is_receipt": True, "date": "2026-02-20\n"})
+
+
+class TestParseLine:
+    """Tests for _parse_line()."""
+
+    def test_decodes_a_record(self):
+        assert _parse_line(b'\xef\xbb\xbf{"store": "Lidl", "amount": 1.5}\r') == {"store": "Lidl", "amount": 1.5}
+
+    def test_matches_the_stdlib_on_edge_cases(self):
+        record = _parse_line(b'{"a": NaN, "b": 1e400, "c": "\\ud800"}')
+        assert math.isnan(record["a"]) and record["b"] == math.inf and record["c"] == "\ud800"
+
+    def test_large_integers_stay_exact(self):
+        record = _parse_line(b'{"store": "AH", "amount": 1, "order_id": 123456789012345678901234}')
+        assert record["order_id"] == 123456789012345678901234
+
+    def test_malformed_line_raises_value_error(self):
+        with pytest.raises(ValueError):
+            _parse_line(b'{"store": ')
+
+
+class TestSanitizeForDisplay:
+    """Tests for _sanitize_for_display()."""
+
+    def test_strips_csi_osc_and_bare_esc(self):
+        assert _sanitize_for_display("\x1b[31mMelk\x1b[0m") == "Melk"
+        assert _sanitize_for_display("\x1b]0;title\x07Kaas") == "Kaas"
+        assert _sanitize_for_display("Brood\x1b") == "Brood"
+
+    def test_unterminated_osc_is_dropped(self):
+        assert _sanitize_for_display("Melk\x1b]8;;http://evil") == "Melk"
+
+    def test_truncates(self):
+        assert _sanitize_for_display("x" * 300) == "x" * 200
+
+    def test_many_unterminated_osc_prefixes(self):
+        # Used to rescan to the end of the string for every prefix
+        assert "\x1b" not in _sanitize_for_display("\x1b]" * 20_000, max_len=100_000)
@@ -1,12 +1,22 @@
 """Tests for supermarket_prices.py - search, compare, and deals functions."""
 
-import sys
-from pathlib import Path
+import json
+import math
+import os
+from datetime import datetime
 from unittest.mock import patch
+import urllib.error
 
-sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
-
-from supermarket_prices import search_products, compare_prices, find_deals
+from supermarket_prices import (
+    search_products,
+    compare_prices,
+    find_deals,
+    load_cache,
+    update_cache,
+    _build_search_index,
+    _loads,
+    CHECKJEBON_URL,
+)
 
 
 class TestSearchProducts:
@@ -53,6 +63,23 @@ class TestSearchProducts:
         prices = [r["price"] for r in results]
         assert prices == sorted(prices)
 
+    def test_matches_inside_name_tokens(self):
+        data = {"ah": [{"n": "Halfvollemelk 1L", "p": 1.09}, {"n": "Karnemelk", "p": 0.99}, {"n": "Kaas", "p": 3.0}]}
+        with patch("supermarket_prices.get_data", return_value=data):
+            results = search_products("melk", limit=None)
+            refined = search_products("vol melk", limit=None)
+        assert [r["name"] for r in results] == ["Karnemelk", "Halfvollemelk 1L"]
+        assert [r["name"] for r in refined] == ["Halfvollemelk 1L"]
+
+    def test_index_built_only_when_data_is_searched_again(self, sample_store_data):
+        with patch("supermarket_prices.get_data", return_value=sample_store_data), \
+                patch("supermarket_prices._build_search_index", wraps=_build_search_index) as build:
+            first = search_products("melk", limit=None)
+            assert build.call_count == 0  # a one-off query just scans
+            second = search_products("melk", limit=None)
+        assert build.call_count == len(sample_store_data)
+        assert first == second
+
     def test_no_data_available(self):
         with patch("supermarket_prices.get_data", return_value=None):
             results = search_products("melk")
@@ -131,6 +158,13 @@ class TestFindDeals:
             results = find_deals(as_json=True)
         assert results == []
 
+    def test_later_keyword_counts_when_first_is_not_a_deal(self):
+        """melk (max 0.90) is checked first, but 1.00 is still a deal for kaas (max 2.25)."""
+        data = {"ah": [{"n": "Melk Kaas Plakken", "p": 1.00, "s": "", "l": ""}]}
+        with patch("supermarket_prices.get_data", return_value=data):
+            results = find_deals(as_json=True)
+        assert [r["category"] for r in results] == ["kaas"]
+
     def test_store_filter(self):
         data = {
             "ah": [{"n": "Melk 1L", "p": 0.50, "s": "1L", "l": ""}],
@@ -151,3 +185,94 @@ class TestFindDeals:
         with patch("supermarket_prices.get_data", return_value=data):
             results = find_deals(limit=1, as_json=True)
         assert len(results) <= 1
+
+
+class TestLoadCache:
+    """Tests for load_cache() and its parsed snapshot."""
+
+    def _write_cache(self, tmp_path, data):
+        cache_file = tmp_path / "supermarkets-cache.json"
+        cache_file.write_text(json.dumps({"cached_at": datetime.now().isoformat(), "data": data}))
+        return cache_file
+
+    def test_second_load_uses_snapshot(self, tmp_path, sample_store_data):
+        cache_file = self._write_cache(tmp_path, sample_store_data)
+        with patch("supermarket_prices.CACHE_FILE", cache_file):
+            first = load_cache()
+            assert (tmp_path / "supermarkets-cache.bin").exists()
+            with patch("supermarket_prices._loads", side_effect=AssertionError("JSON parsed")):
+                second = load_cache()
+        assert first == second
+        assert second["ah"][0]["_nl"] == "melk halfvol 1l"
+
+    def test_search_reads_index_from_snapshot(self, tmp_path, sample_store_data):
+        cache_file = self._write_cache(tmp_path, sample_store_data)
+        with patch("supermarket_prices.CACHE_FILE", cache_file):
+            load_cache()  # writes the snapshot, tokenizing every store once
+            with patch("supermarket_prices._build_search_index", side_effect=AssertionError("re-tokenized")):
+                results = search_products("melk halfvol", stores=["ah", "lidl"], limit=None)
+        assert [(r["store"], r["price"]) for r in results] == [("lidl", 1.59), ("ah", 1.89)]
+
+    def test_snapshot_ignored_after_json_changes(self, tmp_path, sample_store_data):
+        cache_file = self._write_cache(tmp_path, sample_store_data)
+        with patch("supermarket_prices.CACHE_FILE", cache_file):
+            load_cache()
+            self._write_cache(tmp_path, {"ah": [{"n": "Kaas", "p": 3.0}]})
+            os.utime(cache_file, ns=(0, 1))  # force a new signature within mtime resolution
+            data = load_cache()
+        assert [p["n"] for p in data["ah"]] == ["Kaas"]
+
+
+class TestLoads:
+    """Tests for _loads()."""
+
+    def test_decodes_bytes(self):
+        assert _loads(b'{"n": "Melk", "p": 1.09}') == {"n": "Melk", "p": 1.09}
+
+    def test_accepts_what_only_the_stdlib_decodes(self):
+        assert math.isnan(_loads(b'{"p": NaN}')["p"])
+        assert _loads(b'{"n": "Melk \\ud800"}') == {"n": "Melk \ud800"}
+
+
+class TestUpdateCache:
+    """Tests for update_cache() revalidation."""
+
+    def test_not_modified_keeps_cached_data(self, tmp_path, sample_store_data):
+        cache_file = tmp_path / "supermarkets-cache.json"
+        cache_file.write_text(json.dumps({
+            "cached_at": "2000-01-01T00:00:00", "source": CHECKJEBON_URL, "etag": '"abc"', "data": sample_store_data,
+        }))
+        not_modified = urllib.error.HTTPError(CHECKJEBON_URL, 304, "Not Modified", {}, None)
+        with patch("supermarket_prices.CACHE_DIR", tmp_path), \
+                patch("supermarket_prices.CACHE_FILE", cache_file), \
+                patch("supermarket_prices.urllib.request.urlopen", side_effect=not_modified) as urlopen:
+            data = update_cache()
+            assert load_cache() is not None  # freshness clock restarted
+        assert urlopen.call_args[0][0].get_header("If-none-match") == '"abc"'
+        assert [p["n"] for p in data["lidl"]] == [p["n"] for p in sample_store_data["lidl"]]
+        assert json.loads(cache_file.read_text())["etag"] == '"abc"'
+
+    def test_not_modified_with_snapshot_skips_json_parse(self, tmp_path, sample_store_data):
+        cache_file = tmp_path / "supermarkets-cache.json"
+        cache_file.write_text(json.dumps({
+            "cached_at": "2000-01-01T00:00:00", "source": CHECKJEBON_URL, "etag": '"abc"', "data": sample_store_data,
+        }))
+        not_modified = urllib.error.HTTPError(CHECKJEBON_URL, 304, "Not Modified", {}, None)
+        with patch("supermarket_prices.CACHE_DIR", tmp_path), \
+                patch("supermarket_prices.CACHE_FILE", cache_file):
+            assert load_cache() is None  # stale, but leaves the snapshot behind
+            with patch("supermarket_prices.urllib.request.urlopen", side_effect=not_modified) as urlopen, \
+                    patch("supermarket_prices._loads", side_effect=AssertionError("JSON parsed")):
+                data = update_cache()
+        assert urlopen.call_args[0][0].get_header("If-none-match") == '"abc"'
+        assert [p["n"] for p in data["ah"]] == [p["n"] for p in sample_store_data["ah"]]
+        assert "_nl" not in json.loads(cache_file.read_text())["data"]["ah"][0]
+
+    def test_etag_from_other_source_is_not_sent(self, tmp_path, sample_store_data):
+        cache_file = tmp_path / "supermarkets-cache.json"
+        cache_file.write_text(json.dumps({"source": "https://old", "etag": '"abc"', "data": sample_store_data}))
+        with patch("supermarket_prices.CACHE_DIR", tmp_path), \
+                patch("supermarket_prices.CACHE_FILE", cache_file), \
+                patch("supermarket_prices.urllib.request.urlopen", side_effect=OSError("offline")) as urlopen:
+            assert update_cache() is None
+        assert urlopen.call_args[0][0].get_header("If-none-match") is None